@@ -0,0 +1,123 @@
+"""
+Dashboard analytics.
+
+The summary for a date range is one aggregation over `daily_hours` (one
+document per employee-day, see daily_hours.py): a $facet computes hours per
+day and, via employees.roleId -> roles, hours per role in a single round trip.
+Results are cached briefly per range so a dashboard refreshing every few
+seconds does not re-run the pipeline each time.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+HOURS_SUMS = {
+    "regularHours": {"$sum": "$regularHours"},
+    "overtimeHours": {"$sum": "$overtimeHours"},
+    "shifts": {"$sum": "$shifts"},
+}
+
+
+def summary_pipeline(start_date: str, end_date: str) -> list:
+    return [
+        {"$match": {"date": {"$gte": start_date, "$lte": end_date}, "shifts": {"$gt": 0}}},
+        {
+            "$facet": {
+                "byDay": [
+                    {"$group": {"_id": "$date", **HOURS_SUMS, "employees": {"$sum": 1}}},
+                    {"$sort": {"_id": 1}},
+                ],
+                "byRole": [
+                    {"$group": {"_id": "$employeeId", **HOURS_SUMS}},
+                    {
+                        "$lookup": {
+                            "from": "employees",
+                            "localField": "_id",
+                            "foreignField": "id",
+                            "as": "employee"
+                        }
+                    },
+                    {"$unwind": {"path": "$employee", "preserveNullAndEmptyArrays": True}},
+                    {
+                        "$group": {
+                            "_id": "$employee.roleId",
+                            "regularHours": {"$sum": "$regularHours"},
+                            "overtimeHours": {"$sum": "$overtimeHours"},
+                            "shifts": {"$sum": "$shifts"},
+                            "employees": {"$sum": 1}
+                        }
+                    },
+                    {
+                        "$lookup": {
+                            "from": "roles",
+                            "localField": "_id",
+                            "foreignField": "id",
+                            "as": "role"
+                        }
+                    },
+                    {"$project": {**{field: 1 for field in HOURS_SUMS}, "employees": 1, "roleName": {"$arrayElemAt": ["$role.name", 0]}}},
+                    {"$sort": {"roleName": 1}},
+                ],
+            }
+        },
+    ]
+
+
+def hours_row(row: dict) -> dict:
+    regular = round(row["regularHours"], 2)
+    overtime = round(row["overtimeHours"], 2)
+    return {
+        "regularHours": regular,
+        "overtimeHours": overtime,
+        "totalHours": round(regular + overtime, 2),
+        "shifts": row["shifts"],
+    }
+
+
+def shape_summary(facets: dict) -> dict:
+    hours_per_day = [
+        {"date": row["_id"], **hours_row(row), "employees": row["employees"]}
+        for row in facets["byDay"]
+    ]
+    hours_per_role = [
+        # Employees deleted since, or whose role no longer exists, group under null
+        {"roleId": row.get("_id"), "roleName": row.get("roleName"), **hours_row(row), "employees": row["employees"]}
+        for row in facets["byRole"]
+    ]
+    totals = hours_row({
+        field: sum(row[field] for row in facets["byDay"])
+        for field in HOURS_SUMS
+    })
+    return {"totals": totals, "hoursPerDay": hours_per_day, "hoursPerRole": hours_per_role}
+
+
+class SummaryCache:
+    """
+    Small TTL cache of summaries keyed by date range
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0, max_entries: int = 64):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, str]) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Tuple[str, str], summary: dict) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, summary)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "ttlSeconds": self.ttl_seconds}
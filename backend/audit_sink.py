@@ -0,0 +1,101 @@
+"""
+Write-behind buffer for audit log entries.
+
+emit() queues an entry and returns immediately; a background task flushes
+the queue with one insert_many whenever max_batch entries are waiting or
+flush_interval seconds have passed. A full queue makes emit() wait
+(backpressure) instead of growing without bound, and close() drains whatever
+is left on shutdown.
+
+emit(..., durable=True) writes synchronously for actions whose audit trail
+must be on disk before the response goes out, such as correction approvals.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AuditSink:
+    def __init__(
+        self,
+        write_many: Callable[[List[dict]], Awaitable],
+        max_batch: int = 100,
+        flush_interval: float = 0.5,
+        max_queue: int = 10000
+    ):
+        self._write_many = write_many
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.durable_written = 0
+        self.batches = 0
+        self.failed = 0
+
+    async def emit(self, entry: dict, durable: bool = False) -> None:
+        if durable or self._task is None:
+            # Not started (e.g. scripts) behaves like a durable write
+            await self._write_many([entry])
+            self.durable_written += 1
+            return
+        await self._queue.put(entry)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """
+        Stop the flusher and write out everything still queued
+        """
+        if self._task is None:
+            return
+        # Every queued entry is marked done only after its batch is written
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[dict]) -> None:
+        try:
+            await self._write_many(batch)
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Failed to write {len(batch)} audit log entries: {e}")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "maxQueue": self._queue.maxsize,
+            "written": self.written,
+            "durableWritten": self.durable_written,
+            "batches": self.batches,
+            "failed": self.failed,
+        }
@@ -0,0 +1,360 @@
+"""
+Month-partitioned audit log storage.
+
+Entries live in one collection per UTC month (audit_logs_YYYYMM), so a query
+for a date range only touches the partitions that overlap it, and old months
+can be archived by dropping whole collections. Queries page by keyset on
+(timestamp, id), newest first, across partition boundaries.
+
+Partitions older than N months can be compacted into gzip-compressed JSONL
+files on local disk; they stay queryable with include_archived=True, which
+reads the relevant files on demand.
+
+    python audit_store.py archive --older-than 6
+    python audit_store.py partition-legacy   # move the old audit_logs collection
+
+Archive files are read and written in a worker thread so a large month does
+not stall the event loop.
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import operator
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import IndexModel, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from pagination import decode_cursor, encode_cursor, keyset_filter
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = "audit_logs_"
+LEGACY_COLLECTION = "audit_logs"
+LEGACY_LOCK = "audit-partition-legacy"
+# Renewed after every batch; only an abandoned move outlives it
+LEGACY_LOCK_SECONDS = 600
+ARCHIVE_CHUNK_SIZE = 1000
+AUDIT_SORT = [("timestamp", -1), ("id", -1)]
+
+AUDIT_PARTITION_INDEXES = [
+    # Legacy moves upsert by id; the unique index makes a retried batch a no-op
+    IndexModel([("id", 1)], unique=True),
+    IndexModel([("timestamp", -1), ("id", -1)]),
+    IndexModel([("performedBy", 1), ("timestamp", -1), ("id", -1)]),
+    IndexModel([("targetId", 1), ("timestamp", -1), ("id", -1)]),
+    IndexModel([("action", 1), ("timestamp", -1), ("id", -1)]),
+]
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    """
+    Mongo stores datetimes as naive UTC; normalize aware values the same way
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def month_key(value: datetime) -> str:
+    return to_utc_naive(value).strftime("%Y%m")
+
+
+def months_ago(count: int) -> str:
+    now = datetime.utcnow()
+    year, month = now.year, now.month - count
+    while month < 1:
+        year, month = year - 1, month + 12
+    return f"{year:04d}{month:02d}"
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"$date": to_utc_naive(value).isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode(obj: dict):
+    if set(obj) == {"$date"}:
+        return datetime.fromisoformat(obj["$date"])
+    return obj
+
+
+class AuditStore:
+    def __init__(self, db, archive_dir: Path):
+        self._db = db
+        self.archive_dir = Path(archive_dir)
+        self._indexed = set()
+
+    def partition(self, month: str):
+        return self._db[f"{PARTITION_PREFIX}{month}"]
+
+    def archive_path(self, month: str) -> Path:
+        return self.archive_dir / f"{PARTITION_PREFIX}{month}.jsonl.gz"
+
+    async def _ensure_indexed(self, month: str) -> None:
+        if month not in self._indexed:
+            await self.partition(month).create_indexes(AUDIT_PARTITION_INDEXES)
+            self._indexed.add(month)
+
+    async def write_many(self, entries: List[dict]) -> None:
+        by_month: Dict[str, List[dict]] = {}
+        for entry in entries:
+            by_month.setdefault(month_key(entry["timestamp"]), []).append(entry)
+        for month, docs in by_month.items():
+            await self._ensure_indexed(month)
+            await self.partition(month).insert_many(docs, ordered=False)
+
+    async def partitions(self) -> List[str]:
+        names = await self._db.list_collection_names(filter={"name": {"$regex": f"^{PARTITION_PREFIX}[0-9]{{6}}$"}})
+        return sorted((name[len(PARTITION_PREFIX):] for name in names), reverse=True)
+
+    def archived_months(self) -> List[str]:
+        if not self.archive_dir.exists():
+            return []
+        pattern = re.compile(rf"^{PARTITION_PREFIX}(\d{{6}})\.jsonl\.gz$")
+        months = [m.group(1) for m in map(pattern.match, os.listdir(self.archive_dir)) if m]
+        return sorted(months, reverse=True)
+
+    # ------------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------------
+
+    async def query(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        filters: Optional[dict] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        include_archived: bool = False
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        One page of entries in [start, end], newest first, plus the next cursor
+        """
+        start = to_utc_naive(start) if start else None
+        end = to_utc_naive(end) if end else None
+        query = dict(filters or {})
+        if start or end:
+            query["timestamp"] = {}
+            if start:
+                query["timestamp"]["$gte"] = start
+            if end:
+                query["timestamp"]["$lte"] = end
+
+        after = decode_cursor(cursor, AUDIT_SORT) if cursor else None
+        if after:
+            query = {"$and": [query, keyset_filter(AUDIT_SORT, after)]}
+
+        # Only partitions overlapping [start, min(end, cursor)] are touched
+        bounds = [value for value in (end, after[0] if after else None) if value]
+        upper = month_key(min(bounds)) if bounds else None
+        lower = month_key(start) if start else None
+        live = await self.partitions()
+        archived = self.archived_months() if include_archived else []
+        months = [
+            month for month in sorted(set(live) | set(archived), reverse=True)
+            if (lower is None or month >= lower) and (upper is None or month <= upper)
+        ]
+
+        docs: List[dict] = []
+        for month in months:
+            remaining = limit + 1 - len(docs)
+            if remaining <= 0:
+                break
+            if month in live:
+                docs.extend(
+                    await self.partition(month).find(query, {"_id": 0})
+                    .sort(AUDIT_SORT).limit(remaining).to_list(remaining)
+                )
+            if month in archived:
+                docs.extend(await asyncio.to_thread(self._query_archive, month, query, remaining))
+                docs.sort(key=lambda d: (d["timestamp"], d["id"]), reverse=True)
+
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor(docs[-1], AUDIT_SORT)
+        return docs, next_cursor
+
+    def _query_archive(self, month: str, query: dict, limit: int) -> List[dict]:
+        matches = [doc for doc in self._read_archive(month) if matches_query(doc, query)]
+        matches.sort(key=lambda d: (d["timestamp"], d["id"]), reverse=True)
+        return matches[:limit]
+
+    def _read_archive(self, month: str):
+        with gzip.open(self.archive_path(month), "rt") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line, object_hook=_decode)
+
+    # ------------------------------------------------------------------------
+    # Archival and legacy migration
+    # ------------------------------------------------------------------------
+
+    async def archive(self, older_than_months: int) -> List[dict]:
+        """
+        Compact every partition older than N months into a gzip JSONL file,
+        then drop the partition. Re-archiving a month appends to its file.
+        """
+        cutoff = months_ago(older_than_months)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        archived = []
+        for month in await self.partitions():
+            if month >= cutoff:
+                continue
+            path = self.archive_path(month)
+            tmp = path.with_suffix(".gz.tmp")
+            count = 0
+            f = await asyncio.to_thread(gzip.open, tmp, "wt")
+            try:
+                cursor = self.partition(month).find({}, {"_id": 0}).sort(AUDIT_SORT)
+                while True:
+                    docs = await cursor.to_list(ARCHIVE_CHUNK_SIZE)
+                    if not docs:
+                        break
+                    lines = "".join(json.dumps(doc, default=_encode) + "\n" for doc in docs)
+                    await asyncio.to_thread(f.write, lines)
+                    count += len(docs)
+            finally:
+                await asyncio.to_thread(f.close)
+            await asyncio.to_thread(_commit_archive, tmp, path)
+            await self.partition(month).drop()
+            self._indexed.discard(month)
+            archived.append({"month": month, "entries": count, "file": str(path)})
+            logger.info(f"Archived {count} audit entries for {month} to {path}")
+        return archived
+
+    async def partition_legacy(self, batch_size: int = 1000) -> int:
+        """
+        Move entries from the unpartitioned audit_logs collection into monthly
+        partitions, then drop it. Only one process moves at a time (the others
+        return 0 straight away); safe to re-run after an interruption.
+        """
+        if LEGACY_COLLECTION not in await self._db.list_collection_names():
+            return 0
+        if not await acquire_lock(self._db, LEGACY_LOCK, LEGACY_LOCK_SECONDS):
+            return 0
+        try:
+            moved = await self._move_legacy(batch_size)
+        finally:
+            await release_lock(self._db, LEGACY_LOCK)
+        if moved:
+            logger.info(f"Moved {moved} legacy audit entries into monthly partitions")
+        return moved
+
+    async def _move_legacy(self, batch_size: int) -> int:
+        legacy = self._db[LEGACY_COLLECTION]
+        moved = 0
+        while True:
+            batch = await legacy.find({}).limit(batch_size).to_list(batch_size)
+            if not batch:
+                break
+            ids = [doc.pop("_id") for doc in batch]
+            by_month: Dict[str, List[dict]] = {}
+            for doc in batch:
+                by_month.setdefault(month_key(doc["timestamp"]), []).append(doc)
+            for month, docs in by_month.items():
+                # Upserts against the unique id index: a retried batch does not duplicate entries
+                await self._ensure_indexed(month)
+                await self.partition(month).bulk_write(
+                    [UpdateOne({"id": doc["id"]}, {"$setOnInsert": doc}, upsert=True) for doc in docs],
+                    ordered=False
+                )
+            await legacy.delete_many({"_id": {"$in": ids}})
+            moved += len(batch)
+            await acquire_lock(self._db, LEGACY_LOCK, LEGACY_LOCK_SECONDS, renew=True)
+        await legacy.drop()
+        return moved
+
+
+def _commit_archive(tmp: Path, path: Path) -> None:
+    if path.exists():
+        # Concatenated gzip members read back as one stream
+        with open(path, "ab") as out, open(tmp, "rb") as extra:
+            out.write(extra.read())
+        tmp.unlink()
+    else:
+        tmp.rename(path)
+
+
+# ----------------------------------------------------------------------------
+# Maintenance locks: one document per job in `locks`, held until expiresAt so
+# a crashed holder does not block the job forever
+# ----------------------------------------------------------------------------
+
+async def acquire_lock(db, name: str, seconds: float, renew: bool = False) -> bool:
+    now = datetime.utcnow()
+    # An unexpired lock held by someone else matches nothing, so the upsert
+    # tries to insert a second document with the same _id and fails
+    query = {"_id": name} if renew else {"_id": name, "expiresAt": {"$lt": now}}
+    try:
+        await db.locks.update_one(query, {"$set": {"expiresAt": now + timedelta(seconds=seconds)}}, upsert=True)
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+async def release_lock(db, name: str) -> None:
+    await db.locks.delete_one({"_id": name})
+
+
+COMPARATORS = {"$gt": operator.gt, "$gte": operator.ge, "$lt": operator.lt, "$lte": operator.le}
+
+
+def matches_query(doc: dict, query: dict) -> bool:
+    """
+    Evaluate the small query subset AuditStore builds against an archived doc
+    """
+    for field, condition in query.items():
+        if field == "$and":
+            if not all(matches_query(doc, sub) for sub in condition):
+                return False
+        elif field == "$or":
+            if not any(matches_query(doc, sub) for sub in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = doc.get(field)
+            if value is None or not all(COMPARATORS[op](value, operand) for op, operand in condition.items()):
+                return False
+        elif doc.get(field) != condition:
+            return False
+    return True
+
+
+async def _main(args) -> None:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    root = Path(__file__).parent
+    load_dotenv(root / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    store = AuditStore(client[os.environ['DB_NAME']], Path(os.environ.get('AUDIT_ARCHIVE_DIR', root / 'audit_archive')))
+    try:
+        if args.command == "archive":
+            for item in await store.archive(args.older_than):
+                print(f"{item['month']}: {item['entries']} entries -> {item['file']}")
+        elif args.command == "partition-legacy":
+            print(f"Moved {await store.partition_legacy()} entries")
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audit log partition maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    archive_parser = subparsers.add_parser("archive", help="Compact old partitions into gzip JSONL files")
+    archive_parser.add_argument("--older-than", type=int, default=6, help="Months of partitions to keep live")
+    subparsers.add_parser("partition-legacy", help="Move the unpartitioned audit_logs collection")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+In-process cache of authenticated principals.
+
+get_current_admin still verifies every JWT signature and expiry, but the admin
+document behind a token is served from here instead of a Mongo round trip.
+Entries are keyed by a SHA-256 digest of the token, expire after a short TTL
+and are evicted LRU-first once the cache is full.
+
+Revocation uses a per-admin token epoch: tokens carry the epoch they were
+issued under, and bumping an admin's epoch (on password change) rejects older
+tokens without a DB read. The epoch map is per process, so in a multi-worker
+deployment other workers notice within one TTL. Cached principals never hold
+the password hash.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class PrincipalCache:
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._epochs: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.revocations = 0
+
+    def get(self, digest: str) -> Optional[dict]:
+        entry = self._entries.get(digest)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, admin = entry
+        if expires_at < time.monotonic():
+            del self._entries[digest]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(digest)
+        self.hits += 1
+        return admin
+
+    def put(self, digest: str, admin: dict) -> None:
+        self._epochs[admin["username"]] = admin.get("tokenEpoch", 0)
+        self._entries[digest] = (time.monotonic() + self.ttl_seconds, admin)
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def is_revoked(self, username: str, token_epoch: int) -> bool:
+        """
+        True when the token was issued before the admin's latest known epoch
+        """
+        known = self._epochs.get(username)
+        if known is not None and token_epoch < known:
+            self.revocations += 1
+            return True
+        return False
+
+    def set_epoch(self, username: str, epoch: int) -> None:
+        """
+        Record a new epoch for an admin and drop their cached principals
+        """
+        self._epochs[username] = epoch
+        stale = [d for d, (_, admin) in self._entries.items() if admin["username"] == username]
+        for digest in stale:
+            del self._entries[digest]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "revocations": self.revocations,
+            "size": len(self._entries),
+            "maxEntries": self.max_entries,
+            "ttlSeconds": self.ttl_seconds,
+        }
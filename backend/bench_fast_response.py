@@ -0,0 +1,103 @@
+"""
+Benchmark list-response serialization for attendance rows: the per-row model
+path (AttendanceRecord(**rec) in the route, then FastAPI's response_model
+validation and stdlib json) against fast_response.list_response.
+
+Usage: python bench_fast_response.py [row_count]
+
+Imports the models from server.py; no database connection is made.
+"""
+
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'bench')
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from fast_response import list_response
+from server import AttendancePage, AttendanceRecord
+
+
+def make_rows(count):
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1)
+    rows = []
+    for i in range(count):
+        created = start + timedelta(minutes=rng.randrange(0, 60 * 24 * 180))
+        regular = round(rng.uniform(0, 8), 2)
+        overtime = round(rng.uniform(0, 2), 2)
+        rows.append({
+            "id": f"ATT-{i + 1:08d}",
+            "employeeId": f"EMP-{rng.randrange(1, 500):03d}",
+            "date": created.strftime("%Y-%m-%d"),
+            "timeIn": created.isoformat(),
+            "timeOut": (created + timedelta(hours=9)).isoformat(),
+            "regularHours": regular,
+            "overtimeHours": overtime,
+            "totalHours": round(regular + overtime, 2),
+            "notes": "",
+            "status": "COMPLETE",
+            "isLocked": False,
+            "createdAt": created,
+            "updatedAt": created,
+        })
+    return rows
+
+
+PAGE_FIELD = create_response_field(name="Response_bench", type_=AttendancePage, mode="serialization")
+
+
+def per_row_models(rows):
+    """
+    What the routes did before: build each model, then let FastAPI validate
+    and encode the page again through response_model
+    """
+    page = AttendancePage(items=[AttendanceRecord(**rec) for rec in rows], nextCursor=None)
+    content = asyncio.run(serialize_response(field=PAGE_FIELD, response_content=page))
+    return JSONResponse(content).body
+
+
+def batch_validated(rows):
+    return list_response(AttendanceRecord, rows).body
+
+
+def trusted(rows):
+    return list_response(AttendanceRecord, rows, trusted=True).body
+
+
+def best_of(fn, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    rows = make_rows(count)
+
+    assert json.loads(per_row_models(rows)) == json.loads(batch_validated(rows)), "responses differ"
+
+    before = best_of(lambda: per_row_models(rows))
+    after = best_of(lambda: batch_validated(rows))
+    passthrough = best_of(lambda: trusted(rows))
+
+    print(f"rows:                  {count}")
+    print(f"per-row models + json: {before * 1000:.2f} ms")
+    print(f"TypeAdapter + orjson:  {after * 1000:.2f} ms ({before / after:.1f}x)")
+    print(f"trusted + orjson:      {passthrough * 1000:.2f} ms ({before / passthrough:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
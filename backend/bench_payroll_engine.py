@@ -0,0 +1,75 @@
+"""
+Benchmark the vectorized payroll engine against a per-employee Python loop.
+
+Usage: python bench_payroll_engine.py [employee_count]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from deductions import DeductionRegistry
+from payroll_engine import MONTHLY_HOURS, OVERTIME_MULTIPLIER, compute_payroll
+
+TABLES = DeductionRegistry.load(Path(__file__).parent / "deduction_tables").tables_for("2024-06-30")
+
+
+def scalar_payroll(rates, regular, overtime, sss_enabled):
+    """
+    Reference implementation: a per-employee loop with bisect table lookups
+    """
+    results = []
+    for rate, reg, ot, sss_on in zip(rates, regular, overtime, sss_enabled):
+        overtime_rate = rate * OVERTIME_MULTIPLIER
+        gross_pay = reg * rate + ot * overtime_rate
+        monthly_salary = rate * MONTHLY_HOURS
+        deductions = 0
+        for kind, table in TABLES.items():
+            if kind == "sss" and not sss_on:
+                continue
+            deductions += table.lookup(monthly_salary)[0]
+        results.append(round(gross_pay - deductions, 2))
+    return results
+
+
+def best_of(fn, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    rng = np.random.default_rng(42)
+    rates = rng.uniform(60, 200, count).round(2)
+    regular = rng.uniform(0, 96, count).round(2)
+    overtime = rng.uniform(0, 12, count).round(2)
+    sss_enabled = rng.random(count) < 0.9
+
+    rate_list = rates.tolist()
+    regular_list = regular.tolist()
+    overtime_list = overtime.tolist()
+    sss_list = sss_enabled.tolist()
+
+    enabled = {"sss": sss_enabled}
+    engine = compute_payroll(rates, regular, overtime, TABLES, enabled)
+    reference = scalar_payroll(rate_list, regular_list, overtime_list, sss_list)
+    # np.round and round() may settle a half-cent tie differently
+    assert np.allclose(engine["net_pay"], reference, atol=0.01), "engine and reference disagree"
+
+    engine_time = best_of(lambda: compute_payroll(rates, regular, overtime, TABLES, enabled))
+    scalar_time = best_of(lambda: scalar_payroll(rate_list, regular_list, overtime_list, sss_list))
+
+    print(f"employees:       {count}")
+    print(f"numpy engine:    {engine_time * 1000:.2f} ms")
+    print(f"python loop:     {scalar_time * 1000:.2f} ms")
+    print(f"speedup:         {scalar_time / engine_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
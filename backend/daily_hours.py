@@ -0,0 +1,202 @@
+"""
+Per-employee daily hours aggregates.
+
+`daily_hours` holds one document per (employeeId, date) with the summed
+regularHours, overtimeHours and shift count of that day's COMPLETE attendance,
+so payroll reads one small document per employee-day instead of re-summing
+raw attendance. Every code path that changes attendance hours passes the
+record's before and after versions to apply_many(), which $inc's the
+difference.
+
+Aggregates can be recomputed from raw attendance and compared against it:
+
+    python daily_hours.py rebuild [--start 2024-01-01 --end 2024-01-31]
+    python daily_hours.py check   [--start ... --end ...]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ReplaceOne, UpdateOne
+
+HOURS_FIELDS = ("regularHours", "overtimeHours", "shifts")
+
+# Float sums built up by $inc drift by rounding error; anything below this is a match
+TOLERANCE = 0.005
+
+
+def day_key(employee_id: str, date: str) -> str:
+    return f"{employee_id}|{date}"
+
+
+def contribution(record: Optional[dict]) -> Dict[str, float]:
+    """
+    What one attendance record adds to its day: nothing unless it is COMPLETE
+    """
+    if not record or record.get("status") != "COMPLETE":
+        return {field: 0 for field in HOURS_FIELDS}
+    return {
+        "regularHours": record.get("regularHours") or 0,
+        "overtimeHours": record.get("overtimeHours") or 0,
+        "shifts": 1,
+    }
+
+
+def date_match(start: Optional[str], end: Optional[str]) -> dict:
+    match = {}
+    if start:
+        match["$gte"] = start
+    if end:
+        match["$lte"] = end
+    return {"date": match} if match else {}
+
+
+class DailyHours:
+    def __init__(self, db):
+        self._db = db
+        self._collection = db.daily_hours
+
+    def operations(self, changes: Iterable[Tuple[Optional[dict], Optional[dict]]]) -> List[UpdateOne]:
+        """
+        $inc updates that move the aggregates from each record's before version
+        to its after version (None for a record that did not / no longer exists)
+        """
+        deltas: Dict[Tuple[str, str], Dict[str, float]] = {}
+        for before, after in changes:
+            for record, sign in ((before, -1), (after, 1)):
+                if not record:
+                    continue
+                delta = deltas.setdefault((record["employeeId"], record["date"]), dict.fromkeys(HOURS_FIELDS, 0))
+                for field, value in contribution(record).items():
+                    delta[field] += sign * value
+        return [
+            UpdateOne(
+                {"_id": day_key(employee_id, date)},
+                {"$inc": delta, "$setOnInsert": {"employeeId": employee_id, "date": date}},
+                upsert=True
+            )
+            for (employee_id, date), delta in deltas.items()
+            if any(delta.values())
+        ]
+
+    async def apply_many(self, changes: Iterable[Tuple[Optional[dict], Optional[dict]]]) -> None:
+        operations = self.operations(changes)
+        if operations:
+            await self._collection.bulk_write(operations, ordered=False)
+
+    # ------------------------------------------------------------------------
+    # Rebuild and consistency check
+    # ------------------------------------------------------------------------
+
+    async def expected(self, start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, dict]:
+        """
+        Aggregates recomputed from raw attendance, keyed like daily_hours _id
+        """
+        pipeline = [
+            {"$match": {**date_match(start, end), "status": "COMPLETE"}},
+            {
+                "$group": {
+                    "_id": {"employeeId": "$employeeId", "date": "$date"},
+                    "regularHours": {"$sum": {"$ifNull": ["$regularHours", 0]}},
+                    "overtimeHours": {"$sum": {"$ifNull": ["$overtimeHours", 0]}},
+                    "shifts": {"$sum": 1}
+                }
+            },
+        ]
+        rows = await self._db.attendance.aggregate(pipeline).to_list(None)
+        return {
+            day_key(row["_id"]["employeeId"], row["_id"]["date"]): {
+                "employeeId": row["_id"]["employeeId"],
+                "date": row["_id"]["date"],
+                **{field: row[field] for field in HOURS_FIELDS},
+            }
+            for row in rows
+        }
+
+    async def rebuild(self, start: Optional[str] = None, end: Optional[str] = None) -> int:
+        """
+        Recompute every aggregate in the range from attendance. Run it while
+        attendance writes are paused, or follow it with check().
+        """
+        expected = await self.expected(start, end)
+        stored = await self._collection.find(date_match(start, end), {"_id": 1}).to_list(None)
+        stale = [doc["_id"] for doc in stored if doc["_id"] not in expected]
+        operations = [ReplaceOne({"_id": key}, doc, upsert=True) for key, doc in expected.items()]
+        if operations:
+            await self._collection.bulk_write(operations, ordered=False)
+        if stale:
+            await self._collection.delete_many({"_id": {"$in": stale}})
+        return len(expected)
+
+    async def check(self, start: Optional[str] = None, end: Optional[str] = None) -> List[dict]:
+        """
+        Every employee-day where the stored aggregate disagrees with attendance
+        """
+        expected = await self.expected(start, end)
+        stored = {
+            doc["_id"]: doc
+            for doc in await self._collection.find({**date_match(start, end), "shifts": {"$ne": 0}}).to_list(None)
+        }
+        mismatches = []
+        for key in sorted(set(expected) | set(stored)):
+            want = expected.get(key, {})
+            have = stored.get(key, {})
+            if any(abs(want.get(field, 0) - have.get(field, 0)) > TOLERANCE for field in HOURS_FIELDS):
+                mismatches.append({
+                    "key": key,
+                    "expected": {field: want.get(field, 0) for field in HOURS_FIELDS},
+                    "stored": {field: have.get(field, 0) for field in HOURS_FIELDS},
+                })
+        return mismatches
+
+    async def ensure_built(self) -> None:
+        """
+        Backfill on first start, when attendance exists but no aggregates do
+        """
+        if not await self._collection.find_one({}) and await self._db.attendance.find_one({"status": "COMPLETE"}):
+            await self.rebuild()
+
+
+async def _main(args) -> int:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    daily_hours = DailyHours(db)
+    try:
+        if args.command == "rebuild":
+            from payroll_cache import PayrollCache
+
+            affected = set(await db.daily_hours.distinct("employeeId", date_match(args.start, args.end)))
+            print(f"Rebuilt {await daily_hours.rebuild(args.start, args.end)} employee-days")
+            affected |= set(await db.daily_hours.distinct("employeeId", date_match(args.start, args.end)))
+            # Payroll results cached from the old aggregates must not be served
+            await PayrollCache(db).bump(affected)
+            return 0
+        mismatches = await daily_hours.check(args.start, args.end)
+        for item in mismatches:
+            print(f"{item['key']:30} expected {item['expected']} stored {item['stored']}")
+        print(f"{len(mismatches)} mismatched employee-day(s)")
+        return 1 if mismatches else 0
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Daily hours aggregate maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("rebuild", "Recompute aggregates from attendance"), ("check", "Compare aggregates with attendance")):
+        command = subparsers.add_parser(name, help=help_text)
+        command.add_argument("--start", help="First date (YYYY-MM-DD)")
+        command.add_argument("--end", help="Last date (YYYY-MM-DD)")
+    sys.exit(asyncio.run(_main(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Statutory deduction registry (SSS, PhilHealth, Pag-IBIG).
+
+Contribution tables live in deduction_tables/ as one JSON file per deduction
+and effective date. Each file is compiled once into sorted NumPy arrays, and
+the payroll period's date picks the table in force. Adding a new year's rates
+only needs a new data file.
+
+A bracket matches the first salary whose upper bound is >= the salary
+("upTo": null means no upper bound). Each share is a fixed amount plus a rate
+applied to the salary clamped to [salaryFloor, salaryCeiling]:
+
+    {"upTo": 4250, "employee": 180.0, "employer": 390.0}
+    {"upTo": null, "employeeRate": 0.025, "employerRate": 0.025}
+"""
+
+import json
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+
+DEDUCTION_KINDS = ("sss", "philhealth", "pagibig")
+
+
+class ContributionTable:
+    """
+    One deduction's brackets, compiled into parallel arrays sorted by bound
+    """
+
+    def __init__(self, spec: dict):
+        self.kind = spec["deduction"]
+        self.effective_date = spec["effectiveDate"]
+        self.description = spec.get("description", "")
+        self.salary_floor = float(spec.get("salaryFloor") or 0)
+        ceiling = spec.get("salaryCeiling")
+        self.salary_ceiling = float(ceiling) if ceiling is not None else float("inf")
+
+        brackets = sorted(
+            spec["brackets"],
+            key=lambda b: float("inf") if b.get("upTo") is None else b["upTo"]
+        )
+        if not brackets or brackets[-1].get("upTo") is not None:
+            raise ValueError(f"{self.kind} {self.effective_date}: last bracket must have upTo null")
+
+        self.upper_bounds = np.array(
+            [float("inf") if b.get("upTo") is None else float(b["upTo"]) for b in brackets]
+        )
+        self.employee_fixed = np.array([float(b.get("employee", 0)) for b in brackets])
+        self.employee_rate = np.array([float(b.get("employeeRate", 0)) for b in brackets])
+        self.employer_fixed = np.array([float(b.get("employer", 0)) for b in brackets])
+        self.employer_rate = np.array([float(b.get("employerRate", 0)) for b in brackets])
+        # Plain list copy so scalar lookups can bisect without touching NumPy
+        self._bounds_list = self.upper_bounds.tolist()
+
+    @property
+    def version(self) -> str:
+        return f"{self.kind}@{self.effective_date}"
+
+    def lookup(self, monthly_salary: float) -> Tuple[float, float]:
+        """
+        Employee and employer share for one salary, by bisect
+        """
+        i = bisect_left(self._bounds_list, monthly_salary)
+        base = min(max(monthly_salary, self.salary_floor), self.salary_ceiling)
+        employee = self.employee_fixed[i] + self.employee_rate[i] * base
+        employer = self.employer_fixed[i] + self.employer_rate[i] * base
+        return round(float(employee), 2), round(float(employer), 2)
+
+    def lookup_many(self, monthly_salaries: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Employee and employer shares for many salaries, by searchsorted
+        """
+        salaries = np.asarray(monthly_salaries, dtype=np.float64)
+        idx = np.searchsorted(self.upper_bounds, salaries, side="left")
+        base = np.clip(salaries, self.salary_floor, self.salary_ceiling)
+        employee = self.employee_fixed[idx] + self.employee_rate[idx] * base
+        employer = self.employer_fixed[idx] + self.employer_rate[idx] * base
+        return np.round(employee, 2), np.round(employer, 2)
+
+
+class DeductionRegistry:
+    """
+    All loaded contribution tables, keyed by deduction and effective date
+    """
+
+    def __init__(self, tables: List[ContributionTable]):
+        self._tables: Dict[str, List[ContributionTable]] = {}
+        for table in tables:
+            self._tables.setdefault(table.kind, []).append(table)
+        for kind, kind_tables in self._tables.items():
+            kind_tables.sort(key=lambda t: t.effective_date)
+            dates = [t.effective_date for t in kind_tables]
+            if len(set(dates)) != len(dates):
+                raise ValueError(f"Duplicate effective dates for {kind}: {dates}")
+        self._dates = {
+            kind: [t.effective_date for t in kind_tables]
+            for kind, kind_tables in self._tables.items()
+        }
+
+    @classmethod
+    def load(cls, directory: Union[str, Path]) -> "DeductionRegistry":
+        tables = []
+        for path in sorted(Path(directory).glob("*.json")):
+            with open(path) as f:
+                tables.append(ContributionTable(json.load(f)))
+        return cls(tables)
+
+    @property
+    def kinds(self) -> List[str]:
+        return [kind for kind in DEDUCTION_KINDS if kind in self._tables]
+
+    def table_for(self, kind: str, on_date: str) -> ContributionTable:
+        """
+        Table in force on an ISO date (YYYY-MM-DD). Dates before the first
+        table fall back to the oldest one we have.
+        """
+        if kind not in self._tables:
+            raise KeyError(f"No contribution tables loaded for {kind}")
+        i = bisect_right(self._dates[kind], on_date[:10]) - 1
+        return self._tables[kind][max(i, 0)]
+
+    def tables_for(self, on_date: str) -> Dict[str, ContributionTable]:
+        return {kind: self.table_for(kind, on_date) for kind in self.kinds}
+
+    def describe(self) -> Dict[str, List[dict]]:
+        return {
+            kind: [
+                {"effectiveDate": t.effective_date, "description": t.description}
+                for t in self._tables[kind]
+            ]
+            for kind in self.kinds
+        }
+
+
+def tables_version(tables: Dict[str, ContributionTable]) -> str:
+    """
+    Stable identifier for a set of tables, e.g. for cache keys
+    """
+    return ",".join(tables[kind].version for kind in sorted(tables))
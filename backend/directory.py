@@ -0,0 +1,129 @@
+"""
+In-process directory of employees and roles.
+
+Both collections are small and change rarely, so each worker loads them into
+dicts at startup and answers lookups (clock-in, payroll, role checks) without
+a round trip. Every employee or role mutation bumps a version in `counters`
+({_id: "directory"}); a worker compares its loaded version with the stored
+one at most once per check_interval and reloads when they differ. Changes
+made by this worker are applied locally right away, so other workers see
+them within one interval. An id missing from the cache is looked up in Mongo
+before being reported as not found, so a new employee or role can be used
+immediately on every worker.
+
+Lookups return the cached documents themselves; callers must not mutate them.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+VERSION_ID = "directory"
+
+
+class Directory:
+    def __init__(self, db, check_interval: float = 1.0):
+        self._db = db
+        self._counters = db.counters
+        self.check_interval = check_interval
+        self._employees: Dict[str, dict] = {}
+        self._roles: Dict[str, dict] = {}
+        self.version = -1
+        self._checked_at = float("-inf")
+        self._lock = asyncio.Lock()
+        self.reloads = 0
+        self.misses = 0
+
+    async def stored_version(self) -> int:
+        doc = await self._counters.find_one({"_id": VERSION_ID})
+        return doc["value"] if doc else 0
+
+    async def load(self) -> None:
+        async with self._lock:
+            version = await self.stored_version()
+            # Read the version first: a change racing with the load bumps it again
+            employees = await self._db.employees.find({}, {"_id": 0}).to_list(None)
+            roles = await self._db.roles.find({}, {"_id": 0}).to_list(None)
+            self._employees = {emp["id"]: emp for emp in employees}
+            self._roles = {role["id"]: role for role in roles}
+            self.version = version
+            self._checked_at = time.monotonic()
+            self.reloads += 1
+
+    async def _check(self) -> None:
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return
+        self._checked_at = time.monotonic()
+        if await self.stored_version() != self.version:
+            await self.load()
+
+    async def _lookup(self, collection, cache: Dict[str, dict], doc_id: str) -> Optional[dict]:
+        await self._check()
+        doc = cache.get(doc_id)
+        if doc is None:
+            # Possibly created by another worker since the last check: ask Mongo
+            self.misses += 1
+            doc = await collection.find_one({"id": doc_id}, {"_id": 0})
+            if doc:
+                cache[doc_id] = doc
+        return doc
+
+    async def employee(self, employee_id: str) -> Optional[dict]:
+        return await self._lookup(self._db.employees, self._employees, employee_id)
+
+    async def role(self, role_id: str) -> Optional[dict]:
+        return await self._lookup(self._db.roles, self._roles, role_id)
+
+    # ------------------------------------------------------------------------
+    # Invalidation (call after the write has been made in Mongo)
+    # ------------------------------------------------------------------------
+
+    async def _bump(self) -> int:
+        counter = await self._counters.find_one_and_update(
+            {"_id": VERSION_ID},
+            {"$inc": {"value": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return counter["value"]
+
+    async def _refresh(self, collection, cache: Dict[str, dict], doc_id: str) -> None:
+        version = await self._bump()
+        doc = await collection.find_one({"id": doc_id}, {"_id": 0})
+        if doc:
+            cache[doc_id] = doc
+        else:
+            cache.pop(doc_id, None)
+        if version == self.version + 1:
+            self.version = version
+        else:
+            # Another worker changed something too; reload on the next lookup
+            self._checked_at = float("-inf")
+
+    async def employee_changed(self, employee_id: str) -> None:
+        await self._refresh(self._db.employees, self._employees, employee_id)
+
+    async def role_changed(self, role_id: str) -> None:
+        await self._refresh(self._db.roles, self._roles, role_id)
+
+    async def invalidate(self) -> None:
+        """
+        After bulk changes (imports): bump the version and reload everything
+        """
+        await self._bump()
+        await self.load()
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "employees": len(self._employees),
+            "roles": len(self._roles),
+            "reloads": self.reloads,
+            "misses": self.misses,
+            "checkIntervalSeconds": self.check_interval,
+        }
@@ -0,0 +1,150 @@
+"""
+Attendance event hub for the Server-Sent Events stream (GET /api/events).
+
+Routes publish events (clock-in, clock-out, correction requests and reviews)
+to an EventHub; each connected client has a bounded queue, and a client too
+slow to keep up has its queue dropped instead of holding memory or blocking
+publishers. It reconnects and starts from a fresh snapshot.
+
+A single worker fans events out in process. With several workers, set
+EVENTS_RELAY=mongo: events are then written to a capped collection and every
+worker (including the publisher) tails it, so each client sees every event
+no matter which worker handled the write.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Optional, Set
+
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Queued in place of an event when a subscriber falls too far behind
+DROPPED = None
+
+
+class Subscription:
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+
+class EventHub:
+    def __init__(self, queue_size: int = 100, relay: Optional["MongoEventRelay"] = None):
+        self.queue_size = queue_size
+        self.relay = relay
+        self._subscribers: Set[Subscription] = set()
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.queue_size)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    async def publish(self, event_type: str, data: dict) -> None:
+        event = {"type": event_type, "data": data, "timestamp": datetime.now(timezone.utc).isoformat()}
+        if self.relay:
+            try:
+                await self.relay.publish(event)
+                return
+            except PyMongoError as e:
+                # Still reach this worker's clients if the relay is down
+                logger.warning(f"Event relay publish failed: {e}")
+        self.deliver({"id": str(next(self._ids)), **event})
+
+    def deliver(self, event: dict) -> None:
+        """
+        Hand an event to every local subscriber without waiting on any of them
+        """
+        self.published += 1
+        for subscription in list(self._subscribers):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._drop(subscription)
+
+    def _drop(self, subscription: Subscription) -> None:
+        subscription.dropped = True
+        self.dropped += 1
+        self._end(subscription)
+
+    def _end(self, subscription: Subscription) -> None:
+        """
+        Discard what the subscriber has not read and tell its stream to finish
+        """
+        self._subscribers.discard(subscription)
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(DROPPED)
+
+    def close(self) -> None:
+        for subscription in list(self._subscribers):
+            self._end(subscription)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "dropped": self.dropped,
+            "queueSize": self.queue_size,
+            "relay": "mongo" if self.relay else None,
+        }
+
+
+def format_sse(event: dict) -> str:
+    data = json.dumps(event["data"], default=str)
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+class MongoEventRelay:
+    """
+    Cross-worker fan-out through a tailable cursor on a capped collection
+    """
+
+    def __init__(self, db, collection: str = "events", size_bytes: int = 4 * 1024 * 1024):
+        self._db = db
+        self._name = collection
+        self._collection = db[collection]
+        self.size_bytes = size_bytes
+        self._task: Optional[asyncio.Task] = None
+
+    async def publish(self, event: dict) -> None:
+        await self._collection.insert_one(dict(event))
+
+    async def start(self, hub: EventHub) -> None:
+        try:
+            await self._db.create_collection(self._name, capped=True, size=self.size_bytes)
+        except CollectionInvalid:
+            pass  # already exists
+        self._task = asyncio.create_task(self._tail(hub))
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _tail(self, hub: EventHub) -> None:
+        # Start after the newest event; clients get older state from the snapshot
+        latest = await self._collection.find_one({}, sort=[("$natural", -1)])
+        last_id = latest["_id"] if latest else None
+        while True:
+            query = {"_id": {"$gt": last_id}} if last_id else {}
+            cursor = self._collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+            try:
+                async for doc in cursor:
+                    last_id = doc.pop("_id")
+                    hub.deliver({"id": str(last_id), **doc})
+            except PyMongoError as e:
+                logger.warning(f"Event relay cursor failed: {e}")
+            # A tailable cursor dies when the collection is empty or rolls over
+            await asyncio.sleep(1)
@@ -0,0 +1,58 @@
+"""
+Fast list responses.
+
+Returning `[Model(**doc) for doc in docs]` from a route with a response_model
+validates every row twice (once in the list comprehension, once in FastAPI's
+response handling) and encodes it with the stdlib json module. The helpers
+here do it once:
+
+- model_projection(Model) fetches only the fields the response carries;
+- validate_many() checks and fills defaults for a whole list in one
+  TypeAdapter call (or passes rows through untouched when trusted=True);
+- list_response() encodes the result with orjson and returns a Response,
+  which FastAPI sends as-is. The route's response_model still documents it.
+
+    python bench_fast_response.py   # before/after timings for 10k attendance rows
+"""
+
+from functools import lru_cache
+from typing import List, Optional, Type
+
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+
+def model_projection(model: Type[BaseModel]) -> dict:
+    """
+    Mongo projection for exactly the model's fields
+    """
+    return {"_id": 0, **{field: 1 for field in model.__fields__}}
+
+
+@lru_cache(maxsize=None)
+def list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def validate_many(model: Type[BaseModel], docs: List[dict], trusted: bool = False) -> List[dict]:
+    """
+    Rows ready for encoding: validated against `model` in a single pass, with
+    defaults filled in for fields older documents lack, or as-is when trusted
+    """
+    if trusted:
+        return docs
+    adapter = list_adapter(model)
+    return adapter.dump_python(adapter.validate_python(docs))
+
+
+def list_response(
+    model: Type[BaseModel],
+    docs: List[dict],
+    next_cursor: Optional[str] = None,
+    paged: bool = True,
+    trusted: bool = False
+) -> ORJSONResponse:
+    items = validate_many(model, docs, trusted)
+    if not paged:
+        return ORJSONResponse(items)
+    return ORJSONResponse({"items": items, "nextCursor": next_cursor})
@@ -0,0 +1,315 @@
+"""
+Declarative index manifest.
+
+INDEX_MANIFEST lists every index the backend relies on, and QUERY_SHAPES lists
+the filter/sort shapes server.py issues against each collection. Indexes are
+applied idempotently in a background task at startup; an index that fails to
+build is logged and skipped rather than blocking the app.
+
+To check that no route's query falls back to a collection scan, run against a
+local mongod (uses a throwaway database):
+
+    python indexes.py --check-plans [--mongo-url mongodb://localhost:27017]
+
+tests/test_index_plans.py runs the same check under pytest when a mongod is
+reachable at MONGO_URL.
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from datetime import datetime
+from typing import Dict, List
+
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
+
+from audit_store import AUDIT_PARTITION_INDEXES, AUDIT_SORT, PARTITION_PREFIX
+
+logger = logging.getLogger(__name__)
+
+
+def index(keys, **options) -> IndexModel:
+    return IndexModel(keys, **options)
+
+
+# ============================================================================
+# INDEX MANIFEST
+# ============================================================================
+
+# Case-insensitive role name uniqueness: nameKey is the casefolded name. Role
+# writes rely on this index alone to reject duplicates, so startup builds it
+# before serving instead of leaving it to the background manifest run
+ROLE_NAME_KEY_INDEX = index([("nameKey", 1)], unique=True)
+
+INDEX_MANIFEST: Dict[str, List[IndexModel]] = {
+    "admins": [
+        index([("username", 1)], unique=True),
+    ],
+    "roles": [
+        index([("id", 1)], unique=True),
+        ROLE_NAME_KEY_INDEX,
+        index([("name", 1), ("id", 1)]),
+        index([("isActive", 1), ("name", 1), ("id", 1)]),
+    ],
+    "employees": [
+        index([("id", 1)], unique=True),
+        index([("roleId", 1)]),
+    ],
+    "attendance": [
+        index([("id", 1)], unique=True),
+        index([("date", -1), ("id", -1)]),
+        index([("employeeId", 1), ("date", -1), ("id", -1)]),
+        index([("timeOut", 1)]),
+        # daily_hours rebuilds and checks only read completed shifts
+        index(
+            [("date", 1), ("employeeId", 1)],
+            name="payroll_complete_date_employeeId",
+            partialFilterExpression={"status": "COMPLETE"}
+        ),
+    ],
+    # _id is "employeeId|date"; payroll reads date ranges, optionally per employee
+    "daily_hours": [
+        index([("date", 1), ("employeeId", 1)]),
+        index([("employeeId", 1), ("date", 1)]),
+    ],
+    # Keyed by employeeId in _id, so the default _id index is the uniqueness check
+    "open_shifts": [],
+    # Sequence documents are looked up by _id only
+    "counters": [],
+    # Payroll cache versions, keyed by employeeId in _id
+    "attendance_versions": [],
+    # Capped event relay (EVENTS_RELAY=mongo), only ever tailed in natural order
+    "events": [],
+    # Maintenance locks (audit_store.acquire_lock), looked up by _id only
+    "locks": [],
+    "correction_requests": [
+        index([("id", 1)], unique=True),
+        index([("createdAt", -1), ("id", -1)]),
+        index([("requestedBy", 1), ("status", 1), ("createdAt", -1), ("id", -1)]),
+        index([("status", 1), ("createdAt", -1), ("id", -1)]),
+    ],
+    # audit_logs_YYYYMM partitions get AUDIT_PARTITION_INDEXES on first write
+    # (audit_store.py); listing them here would recreate the legacy collection
+}
+
+
+# ============================================================================
+# QUERY SHAPES (one entry per distinct filter/sort issued by server.py)
+# ============================================================================
+
+# A shape may set "allowCollscan" when a scan is the expected plan (tiny
+# collections, or operators such as $nin that no index narrows).
+
+# Every audit partition has the same indexes, so one stands in for all of them
+AUDIT_SAMPLE_PARTITION = f"{PARTITION_PREFIX}202401"
+
+QUERY_SHAPES = [
+    {"route": "get_current_admin", "collection": "admins", "filter": {"username": "admin"}},
+    {"route": "get_roles", "collection": "roles", "filter": {}, "sort": [("name", 1), ("id", 1)]},
+    {"route": "get_roles?activeOnly", "collection": "roles", "filter": {"isActive": True}, "sort": [("name", 1), ("id", 1)]},
+    {"route": "update_role", "collection": "roles", "filter": {"id": "r"}},
+    {"route": "migrate_data.resolve_role", "collection": "roles", "filter": {"nameKey": "baker"}},
+    {"route": "delete_role", "collection": "employees", "filter": {"roleId": "r"}},
+    {"route": "update_employee", "collection": "employees", "filter": {"id": "EMP-001"}},
+    {"route": "sync_sequence(employee)", "collection": "employees", "filter": {"id": {"$regex": "^EMP-[0-9]+$"}}},
+    {"route": "get_attendance", "collection": "attendance", "filter": {}, "sort": [("date", -1), ("id", -1)]},
+    {
+        "route": "get_attendance?employeeId",
+        "collection": "attendance",
+        "filter": {"employeeId": "EMP-001"},
+        "sort": [("date", -1), ("id", -1)],
+    },
+    {
+        "route": "get_attendance?employeeId&range",
+        "collection": "attendance",
+        "filter": {"employeeId": "EMP-001", "date": {"$gte": "2024-01-01", "$lte": "2024-01-31"}},
+        "sort": [("date", -1), ("id", -1)],
+    },
+    {
+        "route": "get_attendance?range",
+        "collection": "attendance",
+        "filter": {"date": {"$gte": "2024-01-01", "$lte": "2024-01-31"}},
+        "sort": [("date", -1), ("id", -1)],
+    },
+    {
+        "route": "export_attendance",
+        "collection": "attendance",
+        "filter": {"date": {"$gte": "2024-01-01", "$lte": "2024-01-31"}},
+        "sort": [("date", 1), ("id", 1)],
+    },
+    {"route": "clock_out", "collection": "attendance", "filter": {"id": "ATT-1"}},
+    {"route": "clock_out_batch", "collection": "attendance", "filter": {"id": {"$in": ["ATT-1", "ATT-2"]}}},
+    {
+        "route": "daily_hours.rebuild",
+        "collection": "attendance",
+        "pipeline": [
+            {"$match": {"date": {"$gte": "2024-01-01", "$lte": "2024-01-31"}, "status": "COMPLETE"}},
+            {"$group": {"_id": {"employeeId": "$employeeId", "date": "$date"}, "hours": {"$sum": "$regularHours"}}},
+        ],
+    },
+    {"route": "sync_sequence(attendance)", "collection": "attendance", "filter": {"id": {"$regex": "^ATT-[0-9]+$"}}},
+    {"route": "open_shifts.reconcile", "collection": "attendance", "filter": {"timeOut": None}},
+    {
+        "route": "open_shifts.reconcile?unmatched",
+        "collection": "open_shifts",
+        "filter": {"recordId": {"$nin": ["ATT-1", "ATT-2"]}},
+        # $nin reads every key of any index; open_shifts has one doc per clocked-in employee
+        "allowCollscan": True,
+    },
+    {
+        "route": "run_payroll",
+        "collection": "daily_hours",
+        "pipeline": [
+            {"$match": {"date": {"$gte": "2024-01-01", "$lte": "2024-01-15"}, "shifts": {"$gt": 0}}},
+            {"$group": {"_id": "$employeeId", "hours": {"$sum": "$regularHours"}}},
+        ],
+    },
+    {
+        "route": "calculate_payroll",
+        "collection": "daily_hours",
+        "pipeline": [
+            {"$match": {"date": {"$gte": "2024-01-01", "$lte": "2024-01-15"}, "shifts": {"$gt": 0}, "employeeId": "EMP-001"}},
+            {"$group": {"_id": "$employeeId", "hours": {"$sum": "$regularHours"}}},
+        ],
+    },
+    {
+        "route": "get_analytics_summary",
+        "collection": "daily_hours",
+        "pipeline": [
+            {"$match": {"date": {"$gte": "2024-01-01", "$lte": "2024-01-31"}, "shifts": {"$gt": 0}}},
+            {"$group": {"_id": "$date", "hours": {"$sum": "$regularHours"}}},
+        ],
+    },
+    {"route": "get_analytics_summary?pending", "collection": "correction_requests", "filter": {"status": "PENDING"}},
+    {"route": "review_correction_request", "collection": "correction_requests", "filter": {"id": "c"}},
+    {
+        "route": "get_correction_requests",
+        "collection": "correction_requests",
+        "filter": {},
+        "sort": [("createdAt", -1), ("id", -1)],
+    },
+    {
+        "route": "get_correction_requests?status",
+        "collection": "correction_requests",
+        "filter": {"status": "PENDING"},
+        "sort": [("createdAt", -1), ("id", -1)],
+    },
+    {
+        "route": "get_correction_requests?supervisor",
+        "collection": "correction_requests",
+        "filter": {"requestedBy": "supervisor", "status": "PENDING"},
+        "sort": [("createdAt", -1), ("id", -1)],
+    },
+    {"route": "get_audit_logs", "collection": AUDIT_SAMPLE_PARTITION, "filter": {}, "sort": AUDIT_SORT},
+    {
+        "route": "get_audit_logs?range",
+        "collection": AUDIT_SAMPLE_PARTITION,
+        "filter": {"timestamp": {"$gte": datetime(2024, 1, 1), "$lte": datetime(2024, 1, 31)}},
+        "sort": AUDIT_SORT,
+    },
+    {"route": "get_audit_logs?performedBy", "collection": AUDIT_SAMPLE_PARTITION, "filter": {"performedBy": "admin"}, "sort": AUDIT_SORT},
+    {"route": "get_audit_logs?targetId", "collection": AUDIT_SAMPLE_PARTITION, "filter": {"targetId": "t"}, "sort": AUDIT_SORT},
+    {"route": "get_audit_logs?action", "collection": AUDIT_SAMPLE_PARTITION, "filter": {"action": "CLOCK_OUT"}, "sort": AUDIT_SORT},
+]
+
+
+# ============================================================================
+# APPLYING THE MANIFEST
+# ============================================================================
+
+async def apply_indexes(db, manifest: Dict[str, List[IndexModel]] = INDEX_MANIFEST) -> int:
+    """
+    Create every index in the manifest. Existing identical indexes are a no-op;
+    conflicting or failing ones are logged so one bad index cannot block the rest.
+    Returns the number of indexes that failed.
+    """
+    failures = 0
+    for collection, models in manifest.items():
+        for model in models:
+            try:
+                await db[collection].create_indexes([model])
+            except OperationFailure as e:
+                failures += 1
+                logger.error(f"Index {collection}.{model.document['name']} failed: {e}")
+    logger.info(f"Index manifest applied ({failures} failure(s))")
+    return failures
+
+
+# ============================================================================
+# QUERY PLAN REGRESSION CHECK
+# ============================================================================
+
+def plan_stages(plan) -> List[str]:
+    """
+    Every "stage" name anywhere in an explain() document
+    """
+    stages = []
+    if isinstance(plan, dict):
+        for key, value in plan.items():
+            if key == "stage" and isinstance(value, str):
+                stages.append(value)
+            elif key != "rejectedPlans":
+                stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(plan_stages(item))
+    return stages
+
+
+async def explain_shape(db, shape: dict) -> dict:
+    if "pipeline" in shape:
+        command = {"aggregate": shape["collection"], "pipeline": shape["pipeline"], "cursor": {}}
+    else:
+        command = {"find": shape["collection"], "filter": shape["filter"]}
+        if shape.get("sort"):
+            command["sort"] = dict(shape["sort"])
+    return await db.command("explain", command, verbosity="queryPlanner")
+
+
+async def check_plans(mongo_url: str, db_name: str) -> int:
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[db_name]
+    try:
+        await client.drop_database(db_name)
+        # Planning against an empty collection can short-circuit to EOF, so seed one doc each
+        for collection in {shape["collection"] for shape in QUERY_SHAPES}:
+            await db[collection].insert_one({"_seed": True})
+        if await apply_indexes(db, {**INDEX_MANIFEST, AUDIT_SAMPLE_PARTITION: AUDIT_PARTITION_INDEXES}):
+            return 1
+
+        failed = 0
+        for shape in QUERY_SHAPES:
+            stages = plan_stages(await explain_shape(db, shape))
+            if "COLLSCAN" not in stages:
+                verdict = "ok"
+            else:
+                verdict = "allowed" if shape.get("allowCollscan") else "COLLSCAN"
+            failed += verdict == "COLLSCAN"
+            print(f"{verdict:9} {shape['route']:40} {shape['collection']:20} {' > '.join(stages)}")
+        print(f"\n{len(QUERY_SHAPES) - failed}/{len(QUERY_SHAPES)} query shapes use an index or allow a scan")
+        return 1 if failed else 0
+    finally:
+        await client.drop_database(db_name)
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index manifest utilities")
+    parser.add_argument("--check-plans", action="store_true", help="Fail if any query shape plans a COLLSCAN")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="index_plan_check")
+    args = parser.parse_args()
+
+    if args.check_plans:
+        sys.exit(asyncio.run(check_plans(args.mongo_url, args.db_name)))
+    for collection, models in INDEX_MANIFEST.items():
+        for model in models:
+            print(f"{collection:20} {model.document['name']:45} {dict(model.document['key'])}")
+
+
+if __name__ == "__main__":
+    main()
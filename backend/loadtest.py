@@ -0,0 +1,425 @@
+"""
+Load test for the backend hot paths.
+
+Runs the FastAPI app in process behind httpx's ASGI transport (no uvicorn, no
+network) and drives concurrent scenarios against it:
+
+    login-storm        admins logging in at once (password hashing pool)
+    clock-in-burst     every employee clocks in at shift start, then out
+    dashboard-polling  analytics summary, clocked-in board and lists, polled
+    payroll-cutoff     payroll/calculate for every employee plus payroll runs
+    migration          large JSON imports through /api/migrate
+
+Usage:
+
+    python loadtest.py [--in-memory] [--scenario NAME ...] [--concurrency 50]
+                       [--employees 200] [--requests 1000] [--output run.json]
+
+By default it uses the mongod at MONGO_URL (or mongodb://localhost:27017) with
+a throwaway database, ems_loadtest_<timestamp>, dropped afterwards unless
+--keep-db is given. --in-memory swaps in mongomock_motor instead, which needs
+`pip install mongomock-motor` and measures the app's own overhead rather than
+realistic query cost.
+
+The report is JSON (stdout, or --output) with p50/p95/p99/max latency and
+throughput per route for each scenario, plus the git commit, so runs can be
+compared across commits. The load generator shares the event loop with the
+app, so absolute numbers are pessimistic; compare runs made the same way.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterable, List
+
+import httpx
+
+ROOT_DIR = Path(__file__).parent
+
+SCENARIOS = ["login-storm", "clock-in-burst", "dashboard-polling", "payroll-cutoff", "migration"]
+
+ADMIN_USERNAME = "admin"
+ADMIN_PASSWORD = "admin123"
+ROLE_NAMES = ["Baker", "Cashier", "Barista", "Supervisor"]
+HISTORY_DAYS = 14
+
+
+# ============================================================================
+# RECORDING AND REPORTING
+# ============================================================================
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list
+    """
+    if not ordered:
+        return 0.0
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[tuple]] = {}
+
+    def add(self, route: str, status: int, seconds: float) -> None:
+        self.samples.setdefault(route, []).append((status, seconds))
+
+    def report(self, elapsed: float) -> dict:
+        routes = {}
+        for route, samples in sorted(self.samples.items()):
+            latencies = sorted(seconds * 1000 for _, seconds in samples)
+            statuses: Dict[str, int] = {}
+            for status, _ in samples:
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+            routes[route] = {
+                "count": len(samples),
+                "errors": sum(1 for status, _ in samples if status >= 400),
+                "statuses": statuses,
+                "throughput": round(len(samples) / elapsed, 2) if elapsed else None,
+                "meanMs": round(sum(latencies) / len(latencies), 3),
+                "p50Ms": round(percentile(latencies, 50), 3),
+                "p95Ms": round(percentile(latencies, 95), 3),
+                "p99Ms": round(percentile(latencies, 99), 3),
+                "maxMs": round(latencies[-1], 3),
+            }
+        total = sum(route["count"] for route in routes.values())
+        return {
+            "durationSeconds": round(elapsed, 3),
+            "requests": total,
+            "throughput": round(total / elapsed, 2) if elapsed else None,
+            "routes": routes,
+        }
+
+
+class LoadClient:
+    """
+    httpx client that records every request under a route label
+    """
+
+    def __init__(self, http: httpx.AsyncClient):
+        self.http = http
+        self.recorder = Recorder()
+
+    async def request(self, route: str, method: str, url: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        response = await self.http.request(method, url, **kwargs)
+        self.recorder.add(route, response.status_code, time.perf_counter() - start)
+        return response
+
+
+async def run_concurrently(jobs: Iterable[Callable[[], Awaitable]], concurrency: int) -> None:
+    """
+    Run job factories with at most `concurrency` in flight
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+
+    async def worker():
+        while True:
+            try:
+                job = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await job()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ============================================================================
+# SEED DATA
+# ============================================================================
+
+def employee_id(number: int) -> str:
+    return f"EMP-{number:03d}"
+
+
+def seed_employees(count: int) -> List[dict]:
+    return [
+        {
+            "id": employee_id(i),
+            "fullName": f"Load Test {i}",
+            "email": f"loadtest{i}@example.com",
+            "phone": "09170000000",
+            "address": "Manila",
+            "status": "Active",
+            "role": ROLE_NAMES[i % len(ROLE_NAMES)],
+            "payRate": 80 + (i % 5) * 10,
+            "dateHired": "2024-01-01",
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def history_attendance(employees: int, days: Iterable[str], prefix: str) -> List[dict]:
+    """
+    Completed 8-9 hour shifts; ids use their own prefix so they never collide
+    with ATT- ids handed out by clock-in
+    """
+    rows = []
+    for date in days:
+        for i in range(1, employees + 1):
+            overtime = float(i % 3 == 0)
+            rows.append({
+                "id": f"{prefix}-{date}-{i:05d}",
+                "employeeId": employee_id(i),
+                "date": date,
+                "timeIn": f"{date}T08:00:00+08:00",
+                "timeOut": f"{date}T{17 + int(overtime)}:00:00+08:00",
+                "regularHours": 8.0,
+                "overtimeHours": overtime,
+                "totalHours": 8.0 + overtime,
+                "status": "COMPLETE",
+            })
+    return rows
+
+
+def history_dates(days: int, end: datetime) -> List[str]:
+    return [(end - timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range(days, 0, -1)]
+
+
+# ============================================================================
+# SCENARIOS
+# ============================================================================
+
+class Context:
+    def __init__(self, client: LoadClient, args, dates: List[str]):
+        self.client = client
+        self.args = args
+        self.dates = dates
+
+
+async def login_storm(ctx: Context) -> None:
+    async def login():
+        await ctx.client.request(
+            "POST /api/auth/login", "POST", "/api/auth/login",
+            json={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD}
+        )
+
+    await run_concurrently([login] * ctx.args.logins, ctx.args.concurrency)
+
+
+async def clock_in_burst(ctx: Context) -> None:
+    record_ids = []
+
+    def clock_in(number):
+        async def job():
+            response = await ctx.client.request(
+                "POST /api/attendance/clock-in", "POST", "/api/attendance/clock-in",
+                json={"employeeId": employee_id(number)}
+            )
+            if response.status_code == 200:
+                record_ids.append(response.json()["id"])
+        return job
+
+    def clock_out(record_id):
+        async def job():
+            await ctx.client.request(
+                "POST /api/attendance/clock-out", "POST", "/api/attendance/clock-out",
+                json={"recordId": record_id}
+            )
+        return job
+
+    await run_concurrently([clock_in(i) for i in range(1, ctx.args.employees + 1)], ctx.args.concurrency)
+    await run_concurrently([clock_out(record_id) for record_id in record_ids], ctx.args.concurrency)
+
+
+async def dashboard_polling(ctx: Context) -> None:
+    params = {"startDate": ctx.dates[0], "endDate": ctx.dates[-1]}
+    polls = [
+        ("GET /api/analytics/summary", "/api/analytics/summary", params),
+        ("GET /api/attendance/clocked-in", "/api/attendance/clocked-in", None),
+        ("GET /api/attendance", "/api/attendance", {"limit": 50}),
+        ("GET /api/correction-requests", "/api/correction-requests", None),
+        ("GET /api/employees", "/api/employees", None),
+    ]
+
+    def poll(i):
+        route, url, query = polls[i % len(polls)]
+        return lambda: ctx.client.request(route, "GET", url, params=query)
+
+    await run_concurrently([poll(i) for i in range(ctx.args.requests)], ctx.args.concurrency)
+
+
+async def payroll_cutoff(ctx: Context) -> None:
+    period = {"startDate": ctx.dates[0], "endDate": ctx.dates[-1]}
+
+    def calculate(number):
+        return lambda: ctx.client.request(
+            "GET /api/payroll/calculate", "GET", "/api/payroll/calculate",
+            params={"employeeId": employee_id(number), **period}
+        )
+
+    def run():
+        return ctx.client.request("POST /api/payroll/run", "POST", "/api/payroll/run", json=period)
+
+    # A few admins run the whole cutoff while others check individual employees
+    calculations = [calculate(i) for i in range(1, ctx.args.employees + 1)]
+    step = max(len(calculations) // max(ctx.args.payroll_runs, 1), 1)
+    jobs = []
+    for index, job in enumerate(calculations):
+        if index % step == 0 and index // step < ctx.args.payroll_runs:
+            jobs.append(run)
+        jobs.append(job)
+    await run_concurrently(jobs, ctx.args.concurrency)
+
+
+async def migration(ctx: Context) -> None:
+    # Imports are one admin's job; run them back to back, each with fresh rows
+    per_day = ctx.args.employees
+    days = max(ctx.args.migration_rows // per_day, 1)
+    start = datetime.strptime(ctx.dates[0], "%Y-%m-%d")
+    for batch in range(ctx.args.migrations):
+        batch_end = start - timedelta(days=days * batch)
+        rows = history_attendance(per_day, history_dates(days, batch_end), f"LT{batch}")
+        await ctx.client.request(
+            "POST /api/migrate", "POST", "/api/migrate",
+            json={"employees": [], "attendance": rows}
+        )
+
+
+SCENARIO_RUNNERS = {
+    "login-storm": login_storm,
+    "clock-in-burst": clock_in_burst,
+    "dashboard-polling": dashboard_polling,
+    "payroll-cutoff": payroll_cutoff,
+    "migration": migration,
+}
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def load_app(args):
+    """
+    Import server with the database chosen on the command line
+    """
+    os.environ["MONGO_URL"] = args.mongo_url
+    os.environ["DB_NAME"] = args.db_name
+    if args.in_memory:
+        try:
+            import mongomock_motor
+        except ImportError:
+            sys.exit("--in-memory needs mongomock-motor: pip install mongomock-motor")
+        import motor.motor_asyncio
+        # server.py binds the name at import time, so patch before importing it
+        motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+    sys.path.insert(0, str(ROOT_DIR))
+    import server
+    return server
+
+
+async def run(args) -> dict:
+    server = load_app(args)
+    app = server.app
+    for handler in app.router.on_startup:
+        await handler()
+
+    transport = httpx.ASGITransport(app=app)
+    report = {
+        "commit": git_commit(),
+        "startedAt": datetime.utcnow().isoformat() + "Z",
+        "database": "mongomock" if args.in_memory else args.mongo_url,
+        "config": {
+            "concurrency": args.concurrency,
+            "employees": args.employees,
+            "requests": args.requests,
+            "logins": args.logins,
+            "payrollRuns": args.payroll_runs,
+            "migrations": args.migrations,
+            "migrationRows": args.migration_rows,
+        },
+        "scenarios": {},
+    }
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as http:
+            response = await http.post("/api/auth/login", json={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD})
+            response.raise_for_status()
+            http.headers["Authorization"] = f"Bearer {response.json()['token']}"
+
+            # Employees and two weeks of completed shifts for payroll and analytics
+            dates = history_dates(HISTORY_DAYS, datetime.now(server.PH_TZ))
+            seed = await http.post("/api/migrate", json={
+                "employees": seed_employees(args.employees),
+                "attendance": history_attendance(args.employees, dates, "SEED"),
+            })
+            seed.raise_for_status()
+
+            for name in args.scenario:
+                client = LoadClient(http)
+                print(f"Running {name}...", file=sys.stderr)
+                start = time.perf_counter()
+                await SCENARIO_RUNNERS[name](Context(client, args, dates))
+                report["scenarios"][name] = client.recorder.report(time.perf_counter() - start)
+    finally:
+        # Shutdown flushes the audit sink, so drop the database only after it
+        for handler in app.router.on_shutdown:
+            await handler()
+        if not args.in_memory and not args.keep_db:
+            from motor.motor_asyncio import AsyncIOMotorClient
+
+            cleanup = AsyncIOMotorClient(args.mongo_url)
+            await cleanup.drop_database(args.db_name)
+            cleanup.close()
+    return report
+
+
+def print_summary(report: dict) -> None:
+    for name, scenario in report["scenarios"].items():
+        print(f"\n{name}: {scenario['requests']} requests in {scenario['durationSeconds']}s", file=sys.stderr)
+        for route, stats in scenario["routes"].items():
+            print(
+                f"  {route:36} n={stats['count']:<6} err={stats['errors']:<5} "
+                f"p50={stats['p50Ms']:>9.2f}ms p95={stats['p95Ms']:>9.2f}ms p99={stats['p99Ms']:>9.2f}ms "
+                f"{stats['throughput']:>8.1f}/s",
+                file=sys.stderr
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test of the backend hot paths")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="Scenario to run (repeatable; default all)")
+    parser.add_argument("--in-memory", action="store_true", help="Use mongomock_motor instead of a mongod")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default=f"ems_loadtest_{datetime.utcnow():%Y%m%d%H%M%S}")
+    parser.add_argument("--keep-db", action="store_true", help="Do not drop the load test database afterwards")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--employees", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=1000, help="Dashboard polls")
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--payroll-runs", type=int, default=5)
+    parser.add_argument("--migrations", type=int, default=3)
+    parser.add_argument("--migration-rows", type=int, default=5000)
+    parser.add_argument("--output", type=Path, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+    args.scenario = args.scenario or SCENARIOS
+
+    report = asyncio.run(run(args))
+    print_summary(report)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Request and Mongo metrics in Prometheus text format (GET /metrics).
+
+MetricsMiddleware is a plain ASGI middleware: per request it reads a clock
+twice and updates a few dict entries, labelled by the matched route template
+(e.g. /api/attendance/{record_id}) so cardinality stays bounded. Responses
+sent as text/event-stream (GET /api/events) are long-lived connections, not
+slow requests: they go to their own histogram and open-streams gauge.
+MongoCommandMetrics is a pymongo CommandListener passed to the client via
+event_listeners; it records duration and returned/affected document counts
+per collection and command. Listener callbacks run on pymongo's threads, so
+every metric guards its values with a lock.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+from pymongo import monitoring
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.label_names, labels)} {value}" for labels, value in values]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: Labels = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._values: Dict[Labels, list] = {}
+
+    def observe(self, labels: Labels, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        lines = self.header()
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _format_labels(self.label_names, labels, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "ems_http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+))
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "ems_http_requests_total", "HTTP responses by route and status code", ("method", "route", "status")
+))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "ems_http_requests_in_flight", "Requests currently being served", ("method",)
+))
+HTTP_STREAM_SECONDS = REGISTRY.register(Histogram(
+    "ems_http_stream_duration_seconds", "Event stream connection lifetime by route", ("method", "route"),
+    buckets=(1.0, 10.0, 60.0, 300.0, 900.0, 3600.0, 14400.0)
+))
+HTTP_STREAMS_OPEN = REGISTRY.register(Gauge(
+    "ems_http_streams_open", "Event stream connections currently open", ("method",)
+))
+AUTH_SECONDS = REGISTRY.register(Histogram(
+    "ems_auth_duration_seconds", "Token authentication time by principal source", ("source",)
+))
+MONGO_COMMAND_SECONDS = REGISTRY.register(Histogram(
+    "ems_mongo_command_duration_seconds", "MongoDB command latency", ("collection", "command")
+))
+MONGO_COMMAND_DOCUMENTS = REGISTRY.register(Counter(
+    "ems_mongo_command_documents_total", "Documents returned or written by MongoDB commands", ("collection", "command")
+))
+MONGO_COMMAND_FAILURES = REGISTRY.register(Counter(
+    "ems_mongo_command_failures_total", "Failed MongoDB commands", ("collection", "command")
+))
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = [500]
+        gauge = [HTTP_IN_FLIGHT]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                if is_event_stream(message):
+                    # Long-lived streams are tracked apart from request latency
+                    HTTP_IN_FLIGHT.dec((method,))
+                    HTTP_STREAMS_OPEN.inc((method,))
+                    gauge[0] = HTTP_STREAMS_OPEN
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc((method,))
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            gauge[0].dec((method,))
+            # FastAPI puts the matched APIRoute in the scope; unmatched paths share one label
+            route = scope.get("route")
+            route_label = getattr(route, "path", "<unmatched>")
+            histogram = HTTP_STREAM_SECONDS if gauge[0] is HTTP_STREAMS_OPEN else HTTP_REQUEST_SECONDS
+            histogram.observe((method, route_label), elapsed)
+            HTTP_REQUESTS.inc((method, route_label, str(status[0])))
+
+
+def is_event_stream(message) -> bool:
+    for name, value in message.get("headers", ()):
+        if name.lower() == b"content-type":
+            return value.startswith(b"text/event-stream")
+    return False
+
+
+# Reply field holding the documents a cursor command returned
+_CURSOR_BATCHES = {"find": "firstBatch", "aggregate": "firstBatch", "getMore": "nextBatch"}
+
+
+def command_collection(command_name: str, command) -> str:
+    if command_name == "getMore":
+        return command.get("collection", "")
+    collection = command.get(command_name)
+    return collection if isinstance(collection, str) else ""
+
+
+def returned_documents(command_name: str, reply) -> int:
+    """
+    Documents in a cursor reply's batch, or documents affected by a write
+    """
+    batch = _CURSOR_BATCHES.get(command_name)
+    if batch:
+        return len(reply.get("cursor", {}).get(batch, ()))
+    return reply.get("n", 0)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    def __init__(self):
+        self._pending: Dict[Tuple[int, int], Labels] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        labels = (command_collection(event.command_name, event.command), event.command_name)
+        with self._lock:
+            self._pending[(event.request_id, event.operation_id)] = labels
+
+    def _finish(self, event) -> Labels:
+        with self._lock:
+            return self._pending.pop((event.request_id, event.operation_id), ("", event.command_name))
+
+    def succeeded(self, event):
+        labels = self._finish(event)
+        MONGO_COMMAND_SECONDS.observe(labels, event.duration_micros / 1e6)
+        documents = returned_documents(event.command_name, event.reply)
+        if documents:
+            MONGO_COMMAND_DOCUMENTS.inc(labels, documents)
+
+    def failed(self, event):
+        labels = self._finish(event)
+        MONGO_COMMAND_SECONDS.observe(labels, event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.inc(labels)
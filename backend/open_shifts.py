@@ -0,0 +1,191 @@
+"""
+Open-shift registry.
+
+Each employee with an open shift has exactly one document in `open_shifts`,
+keyed by employeeId (`_id`). Clocking in is a single insert: the _id unique
+index makes a second open shift fail with DuplicateKeyError, with no prior
+read and no check-then-insert race between kiosks. The collection is mirrored
+in memory so the clocked-in board is answered without a query.
+
+Other workers' clock-ins reach this process's mirror through a periodic
+refresh (refresh_interval seconds; 0 disables it).
+
+A clock-in claims the shift before inserting its attendance record. If the
+insert never happens (the request was cancelled or the worker died), the
+claim points at no record; once it is older than claim_grace_seconds it is
+treated as abandoned and cleared by reconcile() or by the next clock-in.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+
+def claim_age_seconds(claim: dict) -> float:
+    """
+    Seconds since a claim's timeIn; unreadable times count as infinitely old
+    """
+    try:
+        time_in = datetime.fromisoformat(claim["timeIn"].replace("Z", "+00:00"))
+    except (KeyError, AttributeError, ValueError):
+        return float("inf")
+    if time_in.tzinfo is None:
+        time_in = time_in.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - time_in).total_seconds()
+
+
+class OpenShiftRegistry:
+    def __init__(self, db, refresh_interval: float = 5.0, claim_grace_seconds: float = 60.0):
+        self._db = db
+        self._collection = db.open_shifts
+        self.refresh_interval = refresh_interval
+        self.claim_grace_seconds = claim_grace_seconds
+        self._open: Dict[str, str] = {}  # employeeId -> attendance record id
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def claim(self, employee_id: str, record_id: str, time_in: str) -> bool:
+        """
+        Open a shift for an employee. False if they already have one.
+        """
+        try:
+            await self._collection.insert_one({"_id": employee_id, "recordId": record_id, "timeIn": time_in})
+        except DuplicateKeyError:
+            return False
+        self._open[employee_id] = record_id
+        return True
+
+    async def claim_many(self, claims: List[Tuple[str, str, str]]) -> Dict[str, str]:
+        """
+        Open shifts for several (employeeId, recordId, timeIn) in one insert.
+        Returns the employees that could not be claimed, with the reason.
+        """
+        if not claims:
+            return {}
+        docs = [{"_id": employee_id, "recordId": record_id, "timeIn": time_in} for employee_id, record_id, time_in in claims]
+        failed = {}
+        try:
+            await self._collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                reason = "Employee is already clocked in" if error.get("code") == 11000 else error.get("errmsg", "Write failed")
+                failed[docs[error["index"]]["_id"]] = reason
+        for doc in docs:
+            if doc["_id"] not in failed:
+                self._open[doc["_id"]] = doc["recordId"]
+        return failed
+
+    async def release(self, employee_id: str, record_id: str) -> None:
+        """
+        Close the employee's open shift if it is the given record
+        """
+        await self._collection.delete_one({"_id": employee_id, "recordId": record_id})
+        if self._open.get(employee_id) == record_id:
+            del self._open[employee_id]
+
+    async def release_many(self, shifts: Iterable[Tuple[str, str]]) -> None:
+        """
+        Close several (employeeId, recordId) shifts in one delete
+        """
+        shifts = list(shifts)
+        if not shifts:
+            return
+        await self._collection.delete_many({"$or": [{"_id": employee_id, "recordId": record_id} for employee_id, record_id in shifts]})
+        for employee_id, record_id in shifts:
+            if self._open.get(employee_id) == record_id:
+                del self._open[employee_id]
+
+    async def release_orphans(self, shifts: Iterable[Tuple[str, str]]) -> None:
+        """
+        Close (employeeId, recordId) claims whose attendance record was never
+        inserted; claims whose record exists are kept
+        """
+        shifts = list(shifts)
+        if not shifts:
+            return
+        inserted = await self._db.attendance.find(
+            {"id": {"$in": [record_id for _, record_id in shifts]}}, {"_id": 0, "id": 1}
+        ).to_list(None)
+        inserted_ids = {rec["id"] for rec in inserted}
+        await self.release_many(shift for shift in shifts if shift[1] not in inserted_ids)
+
+    async def clear_abandoned(self, employee_id: str) -> bool:
+        """
+        Drop the employee's claim if it is past the grace window and its
+        attendance record was never inserted. True if a claim was dropped.
+        """
+        claim = await self._collection.find_one({"_id": employee_id})
+        if not claim or claim_age_seconds(claim) < self.claim_grace_seconds:
+            return False
+        if await self._db.attendance.find_one({"id": claim["recordId"]}, {"_id": 1}):
+            return False
+        await self.release(employee_id, claim["recordId"])
+        return True
+
+    def employee_ids(self) -> List[str]:
+        return list(self._open)
+
+    async def load(self) -> None:
+        docs = await self._collection.find({}, {"recordId": 1}).to_list(None)
+        self._open = {doc["_id"]: doc["recordId"] for doc in docs}
+
+    async def reconcile(self) -> None:
+        """
+        Bring the registry in line with attendance (records with no timeOut).
+        Used at startup and after bulk imports, alongside live clock-ins.
+
+        Clock-in claims the shift before it inserts the attendance record, so
+        a claim whose record is not there (yet) is left alone for the grace
+        window; claims whose record is closed, and record-less claims past the
+        window, are removed.
+        """
+        open_records = await self._db.attendance.find(
+            {"timeOut": None}, {"_id": 0, "id": 1, "employeeId": 1, "timeIn": 1}
+        ).to_list(None)
+        if open_records:
+            await self._collection.bulk_write([
+                UpdateOne(
+                    {"_id": rec["employeeId"]},
+                    {"$setOnInsert": {"recordId": rec["id"], "timeIn": rec["timeIn"]}},
+                    upsert=True
+                )
+                for rec in open_records
+            ], ordered=False)
+        open_ids = [rec["id"] for rec in open_records]
+        unmatched = await self._collection.find({"recordId": {"$nin": open_ids}}).to_list(None)
+        if unmatched:
+            # Everything found here is closed: open records were matched above
+            closed = await self._db.attendance.find(
+                {"id": {"$in": [doc["recordId"] for doc in unmatched]}}, {"_id": 0, "id": 1}
+            ).to_list(None)
+            closed_ids = {rec["id"] for rec in closed}
+            stale = [
+                doc for doc in unmatched
+                if doc["recordId"] in closed_ids or claim_age_seconds(doc) >= self.claim_grace_seconds
+            ]
+            if stale:
+                # Matching on recordId too leaves a newer claim by the same employee alone
+                await self._collection.delete_many({"$or": [{"_id": doc["_id"], "recordId": doc["recordId"]} for doc in stale]})
+        await self.load()
+
+    def start(self) -> None:
+        if self.refresh_interval > 0 and self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.load()
+            except Exception as e:
+                logger.warning(f"Open shift refresh failed: {e}")
@@ -0,0 +1,87 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A page is fetched with the list query plus a range condition on the sort key
+of the last row already returned, so every page is an index range scan of at
+most `limit + 1` documents regardless of how deep the caller has paged. The
+cursor handed to clients is an opaque base64url encoding of that sort key.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+SortSpec = Sequence[Tuple[str, int]]
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and "$date" in value:
+        return datetime.fromisoformat(value["$date"])
+    return value
+
+
+def encode_cursor(doc: dict, sort: SortSpec) -> str:
+    values = [_encode_value(doc.get(field)) for field, _ in sort]
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: SortSpec) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise InvalidCursor("Invalid cursor")
+    return [_decode_value(v) for v in values]
+
+
+def keyset_filter(sort: SortSpec, last_values: list) -> dict:
+    """
+    Condition matching rows strictly after last_values in sort order:
+    (a > x) OR (a == x AND b > y) OR ...
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {f: last_values[j] for j, (f, _) in enumerate(sort[:i])}
+        clause[field] = {"$gt" if direction > 0 else "$lt": last_values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+
+async def fetch_page(
+    collection,
+    query: dict,
+    sort: SortSpec,
+    limit: int,
+    cursor: Optional[str] = None,
+    projection: Optional[dict] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    One page of `collection` matching `query`, plus the cursor of the next page
+    (None on the last page). `sort` must end in a unique field such as id.
+    """
+    if cursor:
+        query = {"$and": [query, keyset_filter(sort, decode_cursor(cursor, sort))]}
+    docs = await collection.find(query, projection).sort(list(sort)).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1], sort)
+    return docs, next_cursor
@@ -0,0 +1,149 @@
+"""
+Argon2 hashing and verification off the event loop.
+
+Password work runs in a small dedicated thread pool (argon2-cffi releases the
+GIL, so threads hash in parallel). Admission is bounded: once max_pending
+calls are queued or running, new calls fail fast with PasswordPoolSaturated
+instead of piling up behind a login storm and starving other routes.
+
+Argon2 parameters come from ARGON2_TIME_COST / ARGON2_MEMORY_COST /
+ARGON2_PARALLELISM. To pick values for this host:
+
+    python password_pool.py calibrate --target-ms 50
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from passlib.context import CryptContext
+
+
+class PasswordPoolSaturated(Exception):
+    pass
+
+
+def build_password_context() -> CryptContext:
+    """
+    Argon2 context using any parameters set in the environment
+    """
+    settings = {}
+    for key in ("time_cost", "memory_cost", "parallelism"):
+        value = os.environ.get(f"ARGON2_{key.upper()}")
+        if value:
+            settings[f"argon2__{key}"] = int(value)
+    # Use Argon2 instead of bcrypt to avoid 72-byte limitation
+    return CryptContext(schemes=["argon2"], deprecated="auto", **settings)
+
+
+class PasswordHasher:
+    def __init__(self, context: CryptContext, max_workers: int = 2, max_pending: int = 16):
+        self.context = context
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="argon2")
+        self._pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(self.context.verify, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def _run(self, fn: Callable, *args):
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordPoolSaturated()
+        self._pending += 1
+        self.peak_pending = max(self.peak_pending, self._pending)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+            self.completed += 1
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "maxPending": self.max_pending,
+            "inFlight": min(self._pending, self.max_workers),
+            "queueDepth": max(self._pending - self.max_workers, 0),
+            "peakPending": self.peak_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+# ============================================================================
+# CALIBRATION
+# ============================================================================
+
+def measure_verify_ms(time_cost: int, memory_cost: int, parallelism: int, samples: int) -> float:
+    context = CryptContext(
+        schemes=["argon2"],
+        argon2__time_cost=time_cost,
+        argon2__memory_cost=memory_cost,
+        argon2__parallelism=parallelism,
+    )
+    hashed = context.hash("calibration-password")
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.verify("calibration-password", hashed)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(target_ms: float, memory_cost: int, parallelism: int, samples: int) -> dict:
+    """
+    Smallest time_cost whose median verify latency reaches target_ms at the
+    given memory cost (KiB). Lowers memory if even time_cost=1 is too slow.
+    """
+    while True:
+        elapsed = measure_verify_ms(1, memory_cost, parallelism, samples)
+        if elapsed <= target_ms or memory_cost <= 8 * parallelism:
+            break
+        memory_cost //= 2
+
+    time_cost = 1
+    while elapsed < target_ms and time_cost < 64:
+        time_cost += 1
+        elapsed = measure_verify_ms(time_cost, memory_cost, parallelism, samples)
+
+    return {
+        "time_cost": time_cost,
+        "memory_cost": memory_cost,
+        "parallelism": parallelism,
+        "verify_ms": round(elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Argon2 password pool utilities")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    calibrate_parser = subparsers.add_parser("calibrate", help="Pick Argon2 parameters for this host")
+    calibrate_parser.add_argument("--target-ms", type=float, default=50.0)
+    calibrate_parser.add_argument("--memory-kib", type=int, default=65536)
+    calibrate_parser.add_argument("--parallelism", type=int, default=2)
+    calibrate_parser.add_argument("--samples", type=int, default=5)
+    args = parser.parse_args()
+
+    result = calibrate(args.target_ms, args.memory_kib, args.parallelism, args.samples)
+    print(f"# median verify: {result['verify_ms']} ms (target {args.target_ms} ms)")
+    print(f"ARGON2_TIME_COST={result['time_cost']}")
+    print(f"ARGON2_MEMORY_COST={result['memory_cost']}")
+    print(f"ARGON2_PARALLELISM={result['parallelism']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Cache of per-employee payroll results.
+
+Entries are keyed by (employeeId, startDate, endDate, deduction tables version)
+and remember the employee's attendance version when they were computed. Every
+attendance write bumps that version in the `attendance_versions` collection,
+so an entry computed before the write is never served again, from this worker
+or any other. The employee's pay fields are part of the check too, so a pay
+rate or deduction flag change also misses.
+
+Writers must update the hours first and bump the version second: a reader
+that sees the old version then at worst caches a result that is already
+superseded, never a stale result under the new version.
+"""
+
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+from pymongo import UpdateOne
+
+PAY_FIELDS = ("fullName", "payRate", "sssEnabled", "philhealthEnabled", "pagibigEnabled")
+
+
+def employee_fingerprint(employee: dict) -> tuple:
+    return tuple(employee.get(field) for field in PAY_FIELDS)
+
+
+class PayrollCache:
+    def __init__(self, db, max_entries: int = 2048):
+        self._versions = db.attendance_versions
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, Tuple[int, tuple, dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    async def version(self, employee_id: str) -> int:
+        doc = await self._versions.find_one({"_id": employee_id})
+        return doc["version"] if doc else 0
+
+    async def bump(self, employee_ids: Iterable[str]) -> None:
+        """
+        Invalidate every cached result for these employees, in all workers
+        """
+        operations = [
+            UpdateOne({"_id": employee_id}, {"$inc": {"version": 1}}, upsert=True)
+            for employee_id in set(employee_ids)
+        ]
+        if operations:
+            await self._versions.bulk_write(operations, ordered=False)
+
+    def get(self, key: tuple, version: int, employee: dict) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        cached_version, fingerprint, result = entry
+        if cached_version != version or fingerprint != employee_fingerprint(employee):
+            del self._entries[key]
+            self.stale += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key: tuple, version: int, employee: dict, result: dict) -> None:
+        self._entries[key] = (version, employee_fingerprint(employee), result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "maxEntries": self.max_entries,
+        }
@@ -0,0 +1,219 @@
+"""
+Opt-in profiling of single requests.
+
+With PROFILING_ENABLED=1 the app gets a ProfileMiddleware. An admin sends
+`X-Profile: 1` (or `?profile=1`) and that one request runs under cProfile;
+every other request only pays a header lookup, and without the setting the
+middleware is not installed at all.
+
+The middleware drives the request coroutine itself, one event-loop step at a
+time, and turns the profiler on only while this request's code is running.
+This gives the profile and two timings that a plain wall clock cannot:
+
+- loopMs: time this request held the event loop. Nothing else on the worker
+  runs meanwhile, so this is the blocking cost (longest step in maxStepMs).
+- awaitedMs: wall time minus loopMs, spent waiting on Mongo, the password
+  pool or other tasks.
+
+loopCpuMs is the thread CPU time of those same steps; a loopMs well above it
+means the loop thread sat in a blocking call. Work done in other tasks or
+threads on the request's behalf is not profiled.
+
+Each profile is saved as <id>.pstats (load with `python -m pstats` or
+snakeviz) plus <id>.json with the timings and the top functions; only the
+newest `keep` are kept. One profile runs at a time; a second request asking
+for one gets 429.
+"""
+
+import asyncio
+import cProfile
+import json
+import pstats
+import re
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, List, Optional
+from urllib.parse import parse_qs
+
+from starlette.responses import JSONResponse
+
+PROFILE_HEADER = b"x-profile"
+TOP_FUNCTIONS = 30
+
+_ID_PATTERN = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$")
+
+
+class SteppedProfile:
+    """
+    Awaitable running a coroutine step by step with the profiler and clocks
+    active only inside each step
+    """
+
+    def __init__(self, coro, profiler: cProfile.Profile):
+        self.coro = coro
+        self.profiler = profiler
+        self.loop_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.max_step_seconds = 0.0
+        self.steps = 0
+
+    def __await__(self):
+        value, error = None, None
+        while True:
+            start, cpu_start = time.perf_counter(), time.thread_time()
+            self.profiler.enable()
+            try:
+                if error is not None:
+                    yielded = self.coro.throw(error)
+                else:
+                    yielded = self.coro.send(value)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.profiler.disable()
+                self._count(time.perf_counter() - start, time.thread_time() - cpu_start)
+            try:
+                value, error = (yield yielded), None
+            except BaseException as e:
+                value, error = None, e
+
+    def _count(self, elapsed: float, cpu: float) -> None:
+        self.steps += 1
+        self.loop_seconds += elapsed
+        self.cpu_seconds += cpu
+        self.max_step_seconds = max(self.max_step_seconds, elapsed)
+
+
+def top_functions(profiler: cProfile.Profile, limit: int = TOP_FUNCTIONS) -> List[dict]:
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {
+            "function": f"{Path(filename).name}:{line}({name})",
+            "calls": calls,
+            "ownMs": round(own * 1000, 3),
+            "cumulativeMs": round(cumulative * 1000, 3),
+        }
+        for (filename, line, name), (_, calls, own, cumulative, _) in rows
+    ]
+
+
+def wants_profile(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            return value == b"1"
+    query = scope.get("query_string", b"")
+    return b"profile" in query and parse_qs(query.decode()).get("profile") == ["1"]
+
+
+def bearer_token(scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode().partition(" ")
+            return token if scheme.lower() == "bearer" and token else None
+    return None
+
+
+class ProfileStore:
+    def __init__(self, directory: Path, keep: int = 50):
+        self.directory = Path(directory)
+        self.keep = keep
+
+    def new_id(self) -> str:
+        return f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+    def save(self, profile_id: str, profiler: cProfile.Profile, summary: dict) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(self.directory / f"{profile_id}.pstats")
+        (self.directory / f"{profile_id}.json").write_text(json.dumps(summary, indent=2))
+        for old in self._summaries()[self.keep:]:
+            old.unlink(missing_ok=True)
+            old.with_suffix(".pstats").unlink(missing_ok=True)
+
+    def _summaries(self) -> List[Path]:
+        if not self.directory.exists():
+            return []
+        # IDs start with the timestamp, so name order is age order
+        return sorted(self.directory.glob("*.json"), reverse=True)
+
+    def list(self) -> List[dict]:
+        summaries = []
+        for path in self._summaries():
+            summary = json.loads(path.read_text())
+            summary.pop("top", None)
+            summaries.append(summary)
+        return summaries
+
+    def summary(self, profile_id: str) -> Optional[dict]:
+        path = self.path(profile_id, "json")
+        return json.loads(path.read_text()) if path else None
+
+    def path(self, profile_id: str, suffix: str) -> Optional[Path]:
+        if not _ID_PATTERN.match(profile_id):
+            return None
+        path = self.directory / f"{profile_id}.{suffix}"
+        return path if path.exists() else None
+
+
+class ProfileMiddleware:
+    def __init__(self, app, store: ProfileStore, authorize: Callable[[str], Awaitable[bool]]):
+        self.app = app
+        self.store = store
+        self.authorize = authorize
+        self._lock = asyncio.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        token = bearer_token(scope)
+        if not token or not await self.authorize(token):
+            # Not an admin: serve the request as if the flag were absent
+            await self.app(scope, receive, send)
+            return
+
+        if self._lock.locked():
+            response = JSONResponse({"detail": "Another request is being profiled"}, status_code=429)
+            await response(scope, receive, send)
+            return
+
+        async with self._lock:
+            await self._profile(scope, receive, send)
+
+    async def _profile(self, scope, receive, send):
+        profile_id = self.store.new_id()
+        profiler = cProfile.Profile()
+        status = [500]
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        stepped = SteppedProfile(self.app(scope, receive, send_with_profile_id), profiler)
+        start = time.perf_counter()
+        try:
+            await stepped
+        finally:
+            wall = time.perf_counter() - start
+            route = scope.get("route")
+            summary = {
+                "id": profile_id,
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(route, "path", None),
+                "status": status[0],
+                "wallMs": round(wall * 1000, 3),
+                "loopMs": round(stepped.loop_seconds * 1000, 3),
+                "loopCpuMs": round(stepped.cpu_seconds * 1000, 3),
+                "awaitedMs": round(max(wall - stepped.loop_seconds, 0) * 1000, 3),
+                "maxStepMs": round(stepped.max_step_seconds * 1000, 3),
+                "steps": stepped.steps,
+                "top": top_functions(profiler),
+            }
+            await asyncio.to_thread(self.store.save, profile_id, profiler, summary)
@@ -0,0 +1,78 @@
+"""
+Atomic sequence allocator backed by the `counters` collection.
+
+Each sequence is one document {_id: name, value: last allocated number}.
+Allocation is a single find_one_and_update with $inc, so concurrent workers
+never hand out the same number and deleting a row never causes reuse.
+
+Workers reserve numbers in blocks: next() serves from a locally reserved
+block and only goes back to Mongo when it runs out, and allocate(count) hands
+a bulk import thousands of numbers in one round trip. Numbers left in a
+block when a worker exits are skipped, never reissued.
+"""
+
+import asyncio
+from typing import Dict, Optional
+
+from pymongo import ReturnDocument
+
+
+def format_id(prefix: str, number: int, width: int = 3) -> str:
+    return f"{prefix}-{str(number).zfill(width)}"
+
+
+def parse_id_number(value: str, prefix: str) -> Optional[int]:
+    """
+    The number in an id like EMP-042, or None for ids in another format
+    """
+    head, _, tail = value.partition("-")
+    if head != prefix or not tail.isdigit():
+        return None
+    return int(tail)
+
+
+class SequenceAllocator:
+    def __init__(self, db, block_sizes: Optional[Dict[str, int]] = None):
+        self._collection = db.counters
+        self.block_sizes = block_sizes or {}
+        self._blocks: Dict[str, range] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def allocate(self, name: str, count: int = 1) -> range:
+        """
+        Reserve `count` consecutive numbers in one round trip
+        """
+        counter = await self._collection.find_one_and_update(
+            {"_id": name},
+            {"$inc": {"value": count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        end = counter["value"] + 1
+        return range(end - count, end)
+
+    async def next(self, name: str) -> int:
+        """
+        Next number for this worker, refilling its block when exhausted
+        """
+        if not self._blocks.get(name):
+            lock = self._locks.setdefault(name, asyncio.Lock())
+            async with lock:
+                if not self._blocks.get(name):
+                    self._blocks[name] = await self.allocate(name, self.block_sizes.get(name, 1))
+        block = self._blocks[name]
+        number, self._blocks[name] = block[0], block[1:]
+        return number
+
+    async def ensure_at_least(self, name: str, value: int) -> None:
+        """
+        Move a sequence past numbers that were assigned outside the allocator
+        """
+        await self._collection.update_one({"_id": name}, {"$max": {"value": value}}, upsert=True)
+
+    def discard(self, name: str) -> None:
+        """
+        Drop this worker's reserved block, e.g. after ensure_at_least moved the
+        sequence past it; the next number comes from a fresh block
+        """
+        self._blocks.pop(name, None)
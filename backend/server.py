@@ -1,18 +1,44 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, status
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.responses import FileResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 import os
+import json
+import asyncio
 import logging
+import time
 from pathlib import Path
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, ValidationError, validator
 from typing import List, Optional
+import secrets
 import uuid
 from datetime import datetime, timedelta
-from passlib.context import CryptContext
 import jwt
 from zoneinfo import ZoneInfo
+from payroll_engine import compute_payroll, payroll_entries
+from deductions import DeductionRegistry, DEDUCTION_KINDS, tables_version
+from auth_cache import PrincipalCache, token_digest
+from password_pool import PasswordHasher, PasswordPoolSaturated, build_password_context
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, fetch_page
+from indexes import ROLE_NAME_KEY_INDEX, apply_indexes
+from open_shifts import OpenShiftRegistry
+from sequences import SequenceAllocator, format_id, parse_id_number
+from audit_sink import AuditSink
+from audit_store import AuditStore
+from fast_response import list_response, model_projection
+from daily_hours import DailyHours
+from payroll_cache import PayrollCache
+from analytics import SummaryCache, shape_summary, summary_pipeline
+from directory import Directory
+from events import DROPPED, EventHub, MongoEventRelay, format_sse
+from metrics import AUTH_SECONDS, REGISTRY, MetricsMiddleware, MongoCommandMetrics
+from slow_queries import RouteContextMiddleware, SlowQueryLog
+from profiling import ProfileMiddleware, ProfileStore
+import orjson
 
 # Philippines timezone
 PH_TZ = ZoneInfo("Asia/Manila")
@@ -23,20 +49,134 @@ load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# Commands over the threshold, viewable at GET /api/admin/slow-queries
+slow_query_log = SlowQueryLog(
+    threshold_ms=float(os.environ.get('SLOW_QUERY_MS', 100)),
+    capacity=int(os.environ.get('SLOW_QUERY_BUFFER', 200)),
+    jsonl_path=os.environ.get('SLOW_QUERY_LOG') or None,
+    explain=os.environ.get('SLOW_QUERY_EXPLAIN') == '1',
+    # The SSE relay's tailable cursor waits on purpose
+    ignore_collections={"events"}
+)
+# Per-collection command timings for GET /metrics
+client = AsyncIOMotorClient(mongo_url, event_listeners=[MongoCommandMetrics(), slow_query_log])
 db = client[os.environ['DB_NAME']]
 
 # Security configuration
 SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production-12345')
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
+# Tokens for GET /api/events travel in the query string, so they are short-lived
+EVENTS_TOKEN_SCOPE = "events"
+EVENTS_TOKEN_SECONDS = int(os.environ.get('EVENTS_TOKEN_SECONDS', 60))
+
+# Employees and roles served from memory; other workers' changes are picked up
+# by a version check at most every DIRECTORY_CHECK_SECONDS
+directory = Directory(db, check_interval=float(os.environ.get('DIRECTORY_CHECK_SECONDS', 1)))
+
+# Open shifts keyed by employee, mirrored in memory for the clocked-in board
+open_shifts = OpenShiftRegistry(
+    db,
+    refresh_interval=float(os.environ.get('OPEN_SHIFTS_REFRESH_SECONDS', 5)),
+    claim_grace_seconds=float(os.environ.get('OPEN_SHIFT_CLAIM_GRACE_SECONDS', 60))
+)
+
+# Generated ids (EMP-001, ATT-00000001) come from counters; attendance ids are
+# reserved in per-worker blocks so clock-ins rarely need the extra round trip
+sequences = SequenceAllocator(db, block_sizes={
+    "employee": 1,
+    "attendance": int(os.environ.get('ATTENDANCE_ID_BLOCK_SIZE', 100))
+})
+
+async def sync_sequence(name: str, collection, prefix: str):
+    """
+    Move a sequence past every existing <prefix>-nnn id in a collection and
+    drop this worker's block, which may predate those ids
+    """
+    docs = await collection.find({"id": {"$regex": f"^{prefix}-[0-9]+$"}}, {"_id": 0, "id": 1}).to_list(None)
+    numbers = [parse_id_number(doc["id"], prefix) for doc in docs]
+    await sequences.ensure_at_least(name, max(numbers, default=0))
+    sequences.discard(name)
+
+async def sync_id_sequences():
+    """
+    Keep generated ids clear of ids that arrived through imports
+    """
+    await sync_sequence("employee", db.employees, "EMP")
+    await sync_sequence("attendance", db.attendance, "ATT")
+
+# Per-employee daily hours, kept in step with attendance for payroll
+daily_hours = DailyHours(db)
+
+# Per-employee payroll results, invalidated by attendance version bumps
+payroll_cache = PayrollCache(db, max_entries=int(os.environ.get('PAYROLL_CACHE_SIZE', 2048)))
+
+# Dashboard summaries, cached briefly per date range
+analytics_cache = SummaryCache(ttl_seconds=float(os.environ.get('ANALYTICS_CACHE_SECONDS', 30)))
 
-# Use Argon2 instead of bcrypt to avoid 72-byte limitation
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+async def record_attendance_changes(changes):
+    """
+    Apply attendance writes (before, after) to daily_hours, then invalidate
+    the affected employees' cached payroll. The order matters; see payroll_cache.py.
+    """
+    changes = list(changes)
+    await daily_hours.apply_many(changes)
+    await payroll_cache.bump(record["employeeId"] for change in changes for record in change if record)
+
+# Audit entries are stored in monthly partitions; old months are archived to disk
+audit_store = AuditStore(db, Path(os.environ.get('AUDIT_ARCHIVE_DIR', ROOT_DIR / 'audit_archive')))
+
+# Audit entries are buffered and written in batches off the request path
+audit_sink = AuditSink(
+    audit_store.write_many,
+    max_batch=int(os.environ.get('AUDIT_FLUSH_BATCH', 100)),
+    flush_interval=float(os.environ.get('AUDIT_FLUSH_SECONDS', 0.5)),
+    max_queue=int(os.environ.get('AUDIT_QUEUE_SIZE', 10000))
+)
+
+# Decoded principals cached per token so protected routes skip the admin lookup
+principal_cache = PrincipalCache(
+    max_entries=int(os.environ.get('AUTH_CACHE_SIZE', 1024)),
+    ttl_seconds=float(os.environ.get('AUTH_CACHE_TTL_SECONDS', 60))
+)
+
+# Statutory contribution tables, compiled once at startup
+DEDUCTION_TABLES_DIR = Path(os.environ.get('DEDUCTION_TABLES_DIR', ROOT_DIR / 'deduction_tables'))
+deduction_registry = DeductionRegistry.load(DEDUCTION_TABLES_DIR)
+
+# Argon2 runs in a bounded thread pool so hashing never blocks the event loop
+pwd_context = build_password_context()
+password_workers = int(os.environ.get('PASSWORD_POOL_WORKERS', min(4, os.cpu_count() or 1)))
+password_hasher = PasswordHasher(
+    pwd_context,
+    max_workers=password_workers,
+    max_pending=int(os.environ.get('PASSWORD_POOL_MAX_PENDING', password_workers * 8))
+)
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# Attendance events pushed to SSE clients; EVENTS_RELAY=mongo fans out across workers
+event_hub = EventHub(
+    queue_size=int(os.environ.get('EVENTS_QUEUE_SIZE', 100)),
+    relay=MongoEventRelay(db) if os.environ.get('EVENTS_RELAY') == 'mongo' else None
+)
+EVENTS_KEEPALIVE_SECONDS = float(os.environ.get('EVENTS_KEEPALIVE_SECONDS', 15))
+
+# Per-request profiles (X-Profile: 1), only when PROFILING_ENABLED=1
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED') == '1'
+profile_store = ProfileStore(
+    Path(os.environ.get('PROFILE_DIR', ROOT_DIR / 'profiles')),
+    keep=int(os.environ.get('PROFILE_KEEP', 50))
+)
+
+# /metrics scrapes send this as a bearer token; without it, only admins may read it
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
+
+# Strong references to fire-and-forget startup tasks
+background_tasks = set()
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -59,6 +199,7 @@ class Admin(BaseModel):
     password: str  # hashed
     role: str = "admin"  # "admin" or "supervisor"
     forcePasswordChange: bool = True
+    tokenEpoch: int = 0  # bumped to revoke previously issued tokens
     createdAt: datetime = Field(default_factory=datetime.utcnow)
     updatedAt: datetime = Field(default_factory=datetime.utcnow)
 
@@ -81,6 +222,8 @@ class Employee(BaseModel):
     payRate: float
     dateHired: str
     sssEnabled: bool = True  # SSS deduction enabled by default
+    philhealthEnabled: bool = True
+    pagibigEnabled: bool = True
     createdAt: datetime = Field(default_factory=datetime.utcnow)
     updatedAt: datetime = Field(default_factory=datetime.utcnow)
 
@@ -153,6 +296,16 @@ class CorrectionRequestReview(BaseModel):
     action: str  # "approve" or "reject"
     reviewNotes: Optional[str] = None
 
+def role_name_key(name: str) -> str:
+    """
+    Case-insensitive identity of a role name, stored as roles.nameKey under a
+    unique index so duplicates are rejected by the insert itself
+    """
+    return name.strip().casefold()
+
+def role_document(role: Role) -> dict:
+    return {**role.dict(), "nameKey": role_name_key(role.name)}
+
 class RoleCreate(BaseModel):
     name: str
 
@@ -181,6 +334,8 @@ class EmployeeCreate(BaseModel):
     payRate: float
     dateHired: str
     sssEnabled: bool = True
+    philhealthEnabled: bool = True
+    pagibigEnabled: bool = True
 
 class EmployeeUpdate(BaseModel):
     fullName: str
@@ -192,6 +347,8 @@ class EmployeeUpdate(BaseModel):
     payRate: float
     dateHired: str
     sssEnabled: bool = True
+    philhealthEnabled: bool = True
+    pagibigEnabled: bool = True
 
 class ClockInRequest(BaseModel):
     employeeId: str
@@ -201,104 +358,69 @@ class ClockOutRequest(BaseModel):
     recordId: str
     notes: str = ""
 
+class ClockInBatchRequest(BaseModel):
+    items: List[ClockInRequest]
+
+class ClockOutBatchRequest(BaseModel):
+    items: List[ClockOutRequest]
+
 class AttendanceUpdate(BaseModel):
     timeIn: str
     timeOut: Optional[str] = None
     overtimeHours: Optional[float] = 0.0
     notes: str = ""
 
+class RolePage(BaseModel):
+    items: List[Role]
+    nextCursor: Optional[str] = None
 
-# ============================================================================
-# SSS DEDUCTION CALCULATOR (Philippines 2024)
-# ============================================================================
+class AttendancePage(BaseModel):
+    items: List[AttendanceRecord]
+    nextCursor: Optional[str] = None
+
+class CorrectionRequestPage(BaseModel):
+    items: List[CorrectionRequest]
+    nextCursor: Optional[str] = None
+
+class AuditLogPage(BaseModel):
+    items: List[AuditLog]
+    nextCursor: Optional[str] = None
 
-def calculate_sss_contribution(monthly_salary: float) -> dict:
-    """
-    Calculate SSS contribution based on Philippines 2024 rates
-    Returns dict with employee share, employer share, and total
-    """
-    # SSS Contribution Table 2024 (Monthly Salary Credit)
-    sss_table = [
-        (4250, 180.00, 390.00),
-        (4750, 202.50, 437.50),
-        (5250, 225.00, 485.00),
-        (5750, 247.50, 532.50),
-        (6250, 270.00, 580.00),
-        (6750, 292.50, 627.50),
-        (7250, 315.00, 675.00),
-        (7750, 337.50, 722.50),
-        (8250, 360.00, 770.00),
-        (8750, 382.50, 817.50),
-        (9250, 405.00, 865.00),
-        (9750, 427.50, 912.50),
-        (10250, 450.00, 960.00),
-        (10750, 472.50, 1007.50),
-        (11250, 495.00, 1055.00),
-        (11750, 517.50, 1102.50),
-        (12250, 540.00, 1150.00),
-        (12750, 562.50, 1197.50),
-        (13250, 585.00, 1245.00),
-        (13750, 607.50, 1292.50),
-        (14250, 630.00, 1340.00),
-        (14750, 652.50, 1387.50),
-        (15250, 675.00, 1435.00),
-        (15750, 697.50, 1482.50),
-        (16250, 720.00, 1530.00),
-        (16750, 742.50, 1577.50),
-        (17250, 765.00, 1625.00),
-        (17750, 787.50, 1672.50),
-        (18250, 810.00, 1720.00),
-        (18750, 832.50, 1767.50),
-        (19250, 855.00, 1815.00),
-        (19750, 877.50, 1862.50),
-        (20250, 900.00, 1910.00),
-        (20750, 922.50, 1957.50),
-        (21250, 945.00, 2005.00),
-        (21750, 967.50, 2052.50),
-        (22250, 990.00, 2100.00),
-        (22750, 1012.50, 2147.50),
-        (23250, 1035.00, 2195.00),
-        (23750, 1057.50, 2242.50),
-        (24250, 1080.00, 2290.00),
-        (24750, 1102.50, 2337.50),
-        (25250, 1125.00, 2385.00),
-        (25750, 1147.50, 2432.50),
-        (26250, 1170.00, 2480.00),
-        (26750, 1192.50, 2527.50),
-        (27250, 1215.00, 2575.00),
-        (27750, 1237.50, 2622.50),
-        (28250, 1260.00, 2670.00),
-        (28750, 1282.50, 2717.50),
-        (29250, 1305.00, 2765.00),
-        (float('inf'), 1350.00, 2865.00),  # Maximum
-    ]
-    
-    employee_share = 0
-    employer_share = 0
-    
-    for bracket_max, ee_contribution, er_contribution in sss_table:
-        if monthly_salary <= bracket_max:
-            employee_share = ee_contribution
-            employer_share = er_contribution
-            break
-    
-    return {
-        "employee_share": employee_share,
-        "employer_share": employer_share,
-        "total_contribution": employee_share + employer_share,
-        "monthly_salary_credit": min(monthly_salary, 30000)  # Max MSC is 30,000
-    }
+
+# Keyset sort orders for paginated listings; each ends in the unique id
+ROLE_SORT = [("name", 1), ("id", 1)]
+ATTENDANCE_SORT = [("date", -1), ("id", -1)]
+CORRECTION_REQUEST_SORT = [("createdAt", -1), ("id", -1)]
+
+async def fetch_page_or_400(collection, query, sort, limit, cursor, projection=None):
+    try:
+        return await fetch_page(collection, query, sort, limit, cursor, projection)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 
 # ============================================================================
 # AUTHENTICATION HELPERS
 # ============================================================================
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+def password_pool_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, please try again",
+        headers={"Retry-After": "1"}
+    )
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except PasswordPoolSaturated:
+        raise password_pool_busy()
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+async def get_password_hash(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except PasswordPoolSaturated:
+        raise password_pool_busy()
 
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
@@ -307,23 +429,87 @@ def create_access_token(data: dict) -> str:
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def create_admin_token(admin: dict) -> str:
+    return create_access_token(data={"sub": admin["username"], "epoch": admin.get("tokenEpoch", 0)})
+
+def create_stream_token(admin: dict) -> str:
+    """
+    Token accepted only by the event stream, valid for EVENTS_TOKEN_SECONDS
+    """
+    return jwt.encode({
+        "sub": admin["username"],
+        "epoch": admin.get("tokenEpoch", 0),
+        "scope": EVENTS_TOKEN_SCOPE,
+        "exp": datetime.utcnow() + timedelta(seconds=EVENTS_TOKEN_SECONDS)
+    }, SECRET_KEY, algorithm=ALGORITHM)
+
 async def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    return await authenticate_token(credentials.credentials)
+
+async def get_stream_admin(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    token: Optional[str] = None
+) -> dict:
+    """
+    Like get_current_admin, but also accepts ?token= since browser
+    EventSource connections cannot send an Authorization header. A query
+    token must be a short-lived stream token from POST /api/events/token,
+    never the admin's session token, which would end up in access logs.
+    """
+    if credentials:
+        return await authenticate_token(credentials.credentials)
+    if token:
+        return await authenticate_token(token, scope=EVENTS_TOKEN_SCOPE)
+    raise HTTPException(status_code=403, detail="Not authenticated")
+
+async def authenticate_token(token: str, scope: Optional[str] = None) -> dict:
+    start = time.perf_counter()
+    source = "rejected"
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-        
-        admin = await db.admins.find_one({"username": username})
-        if admin is None:
-            raise HTTPException(status_code=401, detail="Admin not found")
-        
+        admin, source = await resolve_token(token, scope)
         return admin
+    finally:
+        AUTH_SECONDS.observe((source,), time.perf_counter() - start)
+
+async def resolve_token(token: str, scope: Optional[str] = None):
+    """
+    Return the admin a token belongs to and whether it came from the
+    principal cache or the database. Scoped tokens are only accepted where
+    that scope is asked for, and session tokens only where none is.
+    """
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Could not validate credentials")
+    if payload.get("scope") != scope:
+        raise HTTPException(status_code=401, detail="Token not valid for this endpoint")
+    
+    username: str = payload.get("sub")
+    if username is None:
+        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+    token_epoch = payload.get("epoch", 0)
+    
+    # Revoked tokens are rejected without touching the database
+    if principal_cache.is_revoked(username, token_epoch):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    
+    digest = token_digest(token)
+    admin = principal_cache.get(digest)
+    if admin is not None:
+        return admin, "cache"
+    
+    # The password hash stays out of the principal; change_password reads it fresh
+    admin = await db.admins.find_one({"username": username}, {"password": 0})
+    if admin is None:
+        raise HTTPException(status_code=401, detail="Admin not found")
+    if token_epoch < admin.get("tokenEpoch", 0):
+        principal_cache.set_epoch(username, admin.get("tokenEpoch", 0))
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    
+    principal_cache.put(digest, admin)
+    return admin, "db"
 
 
 # ============================================================================
@@ -332,13 +518,14 @@ async def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(
 
 @app.on_event("startup")
 async def startup_db():
+    slow_query_log.attach(asyncio.get_running_loop(), client)
     # Create default admin if no admins exist
     admin_count = await db.admins.count_documents({})
     if admin_count == 0:
         # Create admin user
         default_admin = Admin(
             username="admin",
-            password=pwd_context.hash("admin123"),
+            password=await get_password_hash("admin123"),
             role="admin",
             forcePasswordChange=True
         )
@@ -348,17 +535,35 @@ async def startup_db():
         # Create supervisor user
         supervisor = Admin(
             username="supervisor",
-            password=pwd_context.hash("supervisor123"),
+            password=await get_password_hash("supervisor123"),
             role="supervisor",
             forcePasswordChange=True
         )
         await db.admins.insert_one(supervisor.dict())
         logger.info("Created supervisor user: supervisor/supervisor123")
     
-    # Create indexes
-    await db.roles.create_index("name", unique=True)
-    await db.admins.create_index("username", unique=True)
-    await db.employees.create_index("id", unique=True)
+    # nameKey must be on every role before its unique index is built; refuse to
+    # start without the index rather than accept case-insensitive duplicates
+    await backfill_role_name_keys()
+    await ensure_role_name_index()
+    
+    # Build indexes from the manifest in indexes.py without holding up startup
+    background_tasks.add(asyncio.create_task(apply_indexes(db)))
+    
+    await sync_id_sequences()
+    await daily_hours.ensure_built()
+    await directory.load()
+    
+    # Seed the open shift registry from attendance and keep it fresh
+    await open_shifts.reconcile()
+    open_shifts.start()
+    audit_sink.start()
+    if event_hub.relay:
+        await event_hub.relay.start(event_hub)
+    
+    # Move any pre-partitioning audit_logs collection into monthly partitions;
+    # a lock document lets only one worker do it
+    background_tasks.add(asyncio.create_task(audit_store.partition_legacy()))
 
 
 # ============================================================================
@@ -368,13 +573,13 @@ async def startup_db():
 @api_router.post("/auth/login", response_model=LoginResponse)
 async def login(request: LoginRequest):
     admin = await db.admins.find_one({"username": request.username})
-    if not admin or not verify_password(request.password, admin["password"]):
+    if not admin or not await verify_password(request.password, admin["password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password"
         )
     
-    access_token = create_access_token(data={"sub": admin["username"]})
+    access_token = create_admin_token(admin)
     return LoginResponse(
         token=access_token,
         username=admin["username"],
@@ -387,27 +592,38 @@ async def change_password(
     request: ChangePasswordRequest,
     current_admin: dict = Depends(get_current_admin)
 ):
-    # Verify current password
-    if not verify_password(request.currentPassword, current_admin["password"]):
+    # Verify against the stored hash, not a cached principal
+    stored = await db.admins.find_one({"username": current_admin["username"]}, {"password": 1})
+    if not stored or not await verify_password(request.currentPassword, stored["password"]):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Current password is incorrect"
         )
     
-    # Update password
-    new_hashed_password = get_password_hash(request.newPassword)
-    await db.admins.update_one(
-        {"username": current_admin["username"]},
+    # Update password and revoke every token issued under the old one; the hash
+    # in the filter makes a concurrent change of the same password lose
+    new_hashed_password = await get_password_hash(request.newPassword)
+    admin = await db.admins.find_one_and_update(
+        {"username": current_admin["username"], "password": stored["password"]},
         {
             "$set": {
                 "password": new_hashed_password,
                 "forcePasswordChange": False,
                 "updatedAt": datetime.utcnow()
-            }
-        }
+            },
+            "$inc": {"tokenEpoch": 1}
+        },
+        return_document=ReturnDocument.AFTER
     )
+    if admin is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Current password is incorrect"
+        )
+    principal_cache.set_epoch(admin["username"], admin.get("tokenEpoch", 0))
     
-    return {"message": "Password changed successfully"}
+    # Hand back a fresh token so the caller stays signed in
+    return {"message": "Password changed successfully", "token": create_admin_token(admin)}
 
 @api_router.get("/auth/me")
 async def get_me(current_admin: dict = Depends(get_current_admin)):
@@ -418,36 +634,139 @@ async def get_me(current_admin: dict = Depends(get_current_admin)):
     }
 
 
+# ============================================================================
+# ADMIN DIAGNOSTICS (PROTECTED)
+# ============================================================================
+
+@api_router.get("/admin/stats")
+async def get_admin_stats(current_admin: dict = Depends(get_current_admin)):
+    """
+    In-process cache and pool counters for this worker
+    """
+    if current_admin.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can view stats")
+    
+    return {
+        "authCache": principal_cache.stats(),
+        "passwordPool": password_hasher.stats(),
+        "auditSink": audit_sink.stats(),
+        "payrollCache": payroll_cache.stats(),
+        "analyticsCache": analytics_cache.stats(),
+        "directory": directory.stats(),
+        "events": event_hub.stats(),
+        "slowQueries": slow_query_log.stats()
+    }
+
+@api_router.get("/admin/slow-queries")
+async def get_slow_queries(
+    limit: int = Query(50, ge=1, le=1000),
+    collection: Optional[str] = None,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """
+    Recent Mongo commands over SLOW_QUERY_MS on this worker, newest first,
+    plus the same records grouped by query shape
+    """
+    if current_admin.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can view slow queries")
+    
+    return {
+        **slow_query_log.stats(),
+        "records": slow_query_log.recent(limit, collection),
+        "byShape": slow_query_log.by_shape()
+    }
+
+async def can_profile(token: str) -> bool:
+    try:
+        admin = await authenticate_token(token)
+    except HTTPException:
+        return False
+    return admin.get("role") == "admin"
+
+def require_profile_admin(current_admin: dict):
+    if current_admin.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can view profiles")
+
+@api_router.get("/admin/profiles")
+async def list_profiles(current_admin: dict = Depends(get_current_admin)):
+    """
+    Saved request profiles on this worker, newest first
+    """
+    require_profile_admin(current_admin)
+    return {"enabled": PROFILING_ENABLED, "profiles": await asyncio.to_thread(profile_store.list)}
+
+@api_router.get("/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str, current_admin: dict = Depends(get_current_admin)):
+    require_profile_admin(current_admin)
+    summary = await asyncio.to_thread(profile_store.summary, profile_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return summary
+
+@api_router.get("/admin/profiles/{profile_id}/pstats")
+async def download_profile(profile_id: str, current_admin: dict = Depends(get_current_admin)):
+    require_profile_admin(current_admin)
+    path = profile_store.path(profile_id, "pstats")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=path.name)
+
+
 # ============================================================================
 # ROLE ROUTES (PROTECTED)
 # ============================================================================
 
-@api_router.get("/roles", response_model=List[Role])
+async def backfill_role_name_keys():
+    """
+    Set nameKey on roles created before it existed
+    """
+    roles = await db.roles.find({"nameKey": {"$exists": False}}, {"_id": 0, "id": 1, "name": 1}).to_list(None)
+    if not roles:
+        return
+    await db.roles.bulk_write(
+        [UpdateOne({"id": role["id"]}, {"$set": {"nameKey": role_name_key(role["name"])}}) for role in roles],
+        ordered=False
+    )
+
+async def ensure_role_name_index():
+    """
+    Build the unique roles.nameKey index, or fail startup if roles that
+    differ only in case prevent it
+    """
+    keys = [role["nameKey"] for role in await db.roles.find({}, {"_id": 0, "nameKey": 1}).to_list(None)]
+    duplicates = sorted({key for key in keys if keys.count(key) > 1})
+    if duplicates:
+        raise RuntimeError(
+            f"Roles differing only in case must be renamed before startup can continue: {duplicates}"
+        )
+    await db.roles.create_indexes([ROLE_NAME_KEY_INDEX])
+
+@api_router.get("/roles", response_model=RolePage)
 async def get_roles(
     activeOnly: bool = False,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_admin: dict = Depends(get_current_admin)
 ):
     query = {"isActive": True} if activeOnly else {}
-    roles = await db.roles.find(query).to_list(1000)
-    return [Role(**role) for role in roles]
+    roles, next_cursor = await fetch_page_or_400(db.roles, query, ROLE_SORT, limit, cursor, model_projection(Role))
+    return list_response(Role, roles, next_cursor)
 
 @api_router.post("/roles", response_model=Role)
 async def create_role(
     role_create: RoleCreate,
     current_admin: dict = Depends(get_current_admin)
 ):
-    # Check if role name already exists (case-insensitive) - escape regex special chars
-    import re
-    escaped_name = re.escape(role_create.name)
-    existing = await db.roles.find_one({"name": {"$regex": f"^{escaped_name}$", "$options": "i"}})
-    if existing:
+    # The unique nameKey index rejects names that differ only in case
+    role = Role(name=role_create.name)
+    try:
+        await db.roles.insert_one(role_document(role))
+    except DuplicateKeyError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Role name already exists"
         )
-    
-    role = Role(name=role_create.name)
-    await db.roles.insert_one(role.dict())
+    await directory.role_changed(role.id)
     return role
 
 @api_router.put("/roles/{role_id}", response_model=Role)
@@ -456,33 +775,27 @@ async def update_role(
     role_update: RoleUpdate,
     current_admin: dict = Depends(get_current_admin)
 ):
-    # Check if role exists
-    role = await db.roles.find_one({"id": role_id})
-    if not role:
-        raise HTTPException(status_code=404, detail="Role not found")
-    
-    # Check if new name conflicts with another role (case-insensitive)
-    existing = await db.roles.find_one({
-        "name": {"$regex": f"^{role_update.name}$", "$options": "i"},
-        "id": {"$ne": role_id}
-    })
-    if existing:
+    # Update role; a name another role already has (in any case) is a duplicate key
+    try:
+        result = await db.roles.update_one(
+            {"id": role_id},
+            {
+                "$set": {
+                    "name": role_update.name,
+                    "nameKey": role_name_key(role_update.name),
+                    "updatedAt": datetime.utcnow()
+                }
+            }
+        )
+    except DuplicateKeyError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Role name already exists"
         )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Role not found")
     
-    # Update role
-    await db.roles.update_one(
-        {"id": role_id},
-        {
-            "$set": {
-                "name": role_update.name,
-                "updatedAt": datetime.utcnow()
-            }
-        }
-    )
-    
+    await directory.role_changed(role_id)
     updated_role = await db.roles.find_one({"id": role_id})
     return Role(**updated_role)
 
@@ -505,6 +818,7 @@ async def toggle_role_active(
             }
         }
     )
+    await directory.role_changed(role_id)
     
     return {"message": f"Role {'activated' if new_active_status else 'deactivated'} successfully"}
 
@@ -524,6 +838,7 @@ async def delete_role(
     result = await db.roles.delete_one({"id": role_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Role not found")
+    await directory.role_changed(role_id)
     
     return {"message": "Role deleted successfully"}
 
@@ -534,8 +849,8 @@ async def delete_role(
 
 @api_router.get("/employees", response_model=List[Employee])
 async def get_employees(current_admin: dict = Depends(get_current_admin)):
-    employees = await db.employees.find().to_list(1000)
-    return [Employee(**emp) for emp in employees]
+    employees = await db.employees.find({}, model_projection(Employee)).to_list(1000)
+    return list_response(Employee, employees, paged=False)
 
 @api_router.post("/employees", response_model=Employee)
 async def create_employee(
@@ -543,15 +858,14 @@ async def create_employee(
     current_admin: dict = Depends(get_current_admin)
 ):
     # Verify role exists and is active
-    role = await db.roles.find_one({"id": employee_create.roleId})
+    role = await directory.role(employee_create.roleId)
     if not role:
         raise HTTPException(status_code=404, detail="Role not found")
     if not role.get("isActive", True):
         raise HTTPException(status_code=400, detail="Cannot assign inactive role")
     
     # Generate employee ID
-    emp_count = await db.employees.count_documents({})
-    emp_id = f"EMP-{str(emp_count + 1).zfill(3)}"
+    emp_id = format_id("EMP", await sequences.next("employee"))
     
     employee = Employee(
         id=emp_id,
@@ -563,10 +877,14 @@ async def create_employee(
         roleId=employee_create.roleId,
         payType="Hourly",
         payRate=employee_create.payRate,
-        dateHired=employee_create.dateHired
+        dateHired=employee_create.dateHired,
+        sssEnabled=employee_create.sssEnabled,
+        philhealthEnabled=employee_create.philhealthEnabled,
+        pagibigEnabled=employee_create.pagibigEnabled
     )
     
     await db.employees.insert_one(employee.dict())
+    await directory.employee_changed(emp_id)
     return employee
 
 @api_router.put("/employees/{employee_id}", response_model=Employee)
@@ -576,17 +894,17 @@ async def update_employee(
     current_admin: dict = Depends(get_current_admin)
 ):
     # Check if employee exists
-    employee = await db.employees.find_one({"id": employee_id})
+    employee = await directory.employee(employee_id)
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
     
     # Verify role exists (can be inactive if employee already had it)
-    role = await db.roles.find_one({"id": employee_update.roleId})
+    role = await directory.role(employee_update.roleId)
     if not role:
         raise HTTPException(status_code=404, detail="Role not found")
     
     # Update employee
-    await db.employees.update_one(
+    result = await db.employees.update_one(
         {"id": employee_id},
         {
             "$set": {
@@ -598,11 +916,19 @@ async def update_employee(
                 "roleId": employee_update.roleId,
                 "payRate": employee_update.payRate,
                 "dateHired": employee_update.dateHired,
+                "sssEnabled": employee_update.sssEnabled,
+                "philhealthEnabled": employee_update.philhealthEnabled,
+                "pagibigEnabled": employee_update.pagibigEnabled,
                 "updatedAt": datetime.utcnow()
             }
         }
     )
     
+    if result.matched_count == 0:
+        # Deleted by another worker since the directory last refreshed
+        raise HTTPException(status_code=404, detail="Employee not found")
+    await directory.employee_changed(employee_id)
+    
     updated_employee = await db.employees.find_one({"id": employee_id})
     return Employee(**updated_employee)
 
@@ -614,6 +940,7 @@ async def delete_employee(
     result = await db.employees.delete_one({"id": employee_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Employee not found")
+    await directory.employee_changed(employee_id)
     
     return {"message": "Employee deleted successfully"}
 
@@ -622,52 +949,128 @@ async def delete_employee(
 # ATTENDANCE ROUTES (PROTECTED)
 # ============================================================================
 
-@api_router.get("/attendance", response_model=List[AttendanceRecord])
+@api_router.get("/attendance", response_model=AttendancePage)
 async def get_attendance(
     employeeId: Optional[str] = None,
     startDate: Optional[str] = None,
     endDate: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_admin: dict = Depends(get_current_admin)
+):
+    query = {}
+    if employeeId:
+        query["employeeId"] = employeeId
+    if startDate and endDate:
+        query["date"] = {"$gte": startDate, "$lte": endDate}
+    
+    records, next_cursor = await fetch_page_or_400(
+        db.attendance, query, ATTENDANCE_SORT, limit, cursor, model_projection(AttendanceRecord)
+    )
+    return list_response(AttendanceRecord, records, next_cursor)
+
+# Fields written to attendance exports, in AttendanceRecord order
+ATTENDANCE_EXPORT_PROJECTION = model_projection(AttendanceRecord)
+
+# Rows per streamed write; independent of the Mongo batch_size so the first
+# bytes go out as soon as the first rows are read
+EXPORT_CHUNK_ROWS = 100
+
+@api_router.get("/attendance/export")
+async def export_attendance(
+    employeeId: Optional[str] = None,
+    startDate: Optional[str] = None,
+    endDate: Optional[str] = None,
+    batch_size: int = Query(1000, ge=1, le=10000),
     current_admin: dict = Depends(get_current_admin)
 ):
+    """
+    Stream matching attendance as newline-delimited JSON, oldest first.
+    Rows are encoded with orjson as the cursor yields them and written in
+    small chunks, so memory stays flat for any range and the download starts
+    right away; they are exported as stored, without re-validation.
+    """
     query = {}
     if employeeId:
         query["employeeId"] = employeeId
     if startDate and endDate:
         query["date"] = {"$gte": startDate, "$lte": endDate}
     
-    records = await db.attendance.find(query).to_list(1000)
-    return [AttendanceRecord(**rec) for rec in records]
+    async def generate():
+        cursor = db.attendance.find(
+            query, ATTENDANCE_EXPORT_PROJECTION, batch_size=batch_size
+        ).sort([("date", 1), ("id", 1)])
+        chunk = []
+        async for record in cursor:
+            chunk.append(orjson.dumps(record))
+            if len(chunk) >= EXPORT_CHUNK_ROWS:
+                yield b"\n".join(chunk) + b"\n"
+                chunk = []
+        if chunk:
+            yield b"\n".join(chunk) + b"\n"
+    
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="attendance.ndjson"'}
+    )
+
+async def publish_clock_in(record: AttendanceRecord):
+    await event_hub.publish("clock-in", {"recordId": record.id, "employeeId": record.employeeId, "timeIn": record.timeIn})
+
+async def publish_clock_out(record: dict, changes: dict):
+    await event_hub.publish("clock-out", {
+        "recordId": record["id"],
+        "employeeId": record["employeeId"],
+        "timeOut": changes["timeOut"],
+        "regularHours": changes["regularHours"]
+    })
+
+# Fresh ids a clock-in tries before giving up on duplicate-key collisions
+CLOCK_IN_ID_ATTEMPTS = 3
 
 @api_router.post("/attendance/clock-in", response_model=AttendanceRecord)
 async def clock_in(
     request: ClockInRequest,
     current_admin: dict = Depends(get_current_admin)
 ):
-    # Check if employee exists
-    employee = await db.employees.find_one({"id": request.employeeId})
+    # Check if employee exists (served from the in-memory directory)
+    employee = await directory.employee(request.employeeId)
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
     
-    # Check if already clocked in
-    open_shift = await db.attendance.find_one({
-        "employeeId": request.employeeId,
-        "timeOut": None
-    })
-    if open_shift:
-        raise HTTPException(status_code=400, detail="Employee is already clocked in")
-    
     # Use Philippines time
     now = datetime.now(PH_TZ)
-    record = AttendanceRecord(
-        id=f"ATT-{now.timestamp()}-{uuid.uuid4().hex[:4]}",
-        employeeId=request.employeeId,
-        date=now.strftime("%Y-%m-%d"),
-        timeIn=now.isoformat(),
-        notes=request.notes
-    )
-    
-    await db.attendance.insert_one(record.dict())
-    return record
+    for attempt in range(CLOCK_IN_ID_ATTEMPTS):
+        record = AttendanceRecord(
+            id=format_id("ATT", await sequences.next("attendance"), width=8),
+            employeeId=request.employeeId,
+            date=now.strftime("%Y-%m-%d"),
+            timeIn=now.isoformat(),
+            notes=request.notes
+        )
+        
+        # Claiming the open shift is the duplicate check: one atomic insert.
+        # A claim left behind by a clock-in that never inserted is cleared once stale.
+        if not await open_shifts.claim(request.employeeId, record.id, record.timeIn):
+            if not (await open_shifts.clear_abandoned(request.employeeId)
+                    and await open_shifts.claim(request.employeeId, record.id, record.timeIn)):
+                raise HTTPException(status_code=400, detail="Employee is already clocked in")
+        
+        try:
+            await db.attendance.insert_one(record.dict())
+        except DuplicateKeyError:
+            # The id was imported after this worker reserved its block: resync and retry
+            await open_shifts.release(request.employeeId, record.id)
+            await sync_sequence("attendance", db.attendance, "ATT")
+            continue
+        except BaseException:
+            # Cancellation included: the claim must not outlive an insert that did not happen
+            await asyncio.shield(open_shifts.release_orphans([(request.employeeId, record.id)]))
+            raise
+        await publish_clock_in(record)
+        return record
+    raise HTTPException(status_code=503, detail="Could not allocate an attendance id, try again")
 
 @api_router.post("/attendance/clock-out", response_model=AttendanceRecord)
 async def clock_out(
@@ -688,19 +1091,26 @@ async def clock_out(
     overtime_hours = record.get("overtimeHours", 0.0)  # Get existing overtime or 0
     total_hours = regular_hours + overtime_hours
     
-    await db.attendance.update_one(
-        {"id": request.recordId},
-        {
-            "$set": {
-                "timeOut": now.isoformat(),
-                "regularHours": regular_hours,
-                "totalHours": total_hours,
-                "notes": request.notes,
-                "status": "COMPLETE",  # Mark as complete
-                "updatedAt": datetime.now(PH_TZ)
-            }
-        }
+    changes = {
+        "timeOut": now.isoformat(),
+        "regularHours": regular_hours,
+        "totalHours": total_hours,
+        "notes": request.notes,
+        "status": "COMPLETE",  # Mark as complete
+        "updatedAt": datetime.now(PH_TZ)
+    }
+    # Guarded on timeOut so two concurrent clock-outs cannot both close the shift
+    before = await db.attendance.find_one_and_update(
+        {"id": request.recordId, "timeOut": None}, {"$set": changes}, return_document=ReturnDocument.BEFORE
     )
+    if before is None:
+        if await db.attendance.find_one({"id": request.recordId}, {"_id": 1}) is None:
+            raise HTTPException(status_code=404, detail="Attendance record not found")
+        raise HTTPException(status_code=400, detail="Already clocked out")
+    await record_attendance_changes([(before, {**before, **changes})])
+    
+    await open_shifts.release(before["employeeId"], request.recordId)
+    await publish_clock_out(before, changes)
     
     # Create audit log
     audit_log = AuditLog(
@@ -710,10 +1120,167 @@ async def clock_out(
         beforeValues={"timeOut": None},
         afterValues={"timeOut": now.isoformat(), "regularHours": regular_hours, "totalHours": total_hours}
     )
-    await db.audit_logs.insert_one(audit_log.dict())
+    await audit_sink.emit(audit_log.dict())
     
-    updated_record = await db.attendance.find_one({"id": request.recordId})
-    return AttendanceRecord(**updated_record)
+    return AttendanceRecord(**{**before, **changes})
+
+# Largest crew one batch clock-in/out may carry
+ATTENDANCE_BATCH_MAX = int(os.environ.get('ATTENDANCE_BATCH_MAX', 200))
+
+def check_batch_size(items: list):
+    if not items:
+        raise HTTPException(status_code=400, detail="No items in batch")
+    if len(items) > ATTENDANCE_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {ATTENDANCE_BATCH_MAX} items per batch")
+
+def batch_response(results: list) -> dict:
+    succeeded = sum(1 for result in results if result["ok"])
+    return {"succeeded": succeeded, "failed": len(results) - succeeded, "results": results}
+
+@api_router.post("/attendance/clock-in/batch")
+async def clock_in_batch(
+    request: ClockInBatchRequest,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """
+    Clock in a crew at once. Every record shares one timestamp; the open-shift
+    claims and the attendance records each go out as a single bulk insert.
+    Results are per item, in request order.
+    """
+    check_batch_size(request.items)
+    now = datetime.now(PH_TZ)
+    
+    results = [None] * len(request.items)
+    pending = []  # (index, record)
+    seen = set()
+    for index, item in enumerate(request.items):
+        if item.employeeId in seen:
+            results[index] = {"employeeId": item.employeeId, "ok": False, "status": 400, "error": "Duplicate employee in batch"}
+        elif not await directory.employee(item.employeeId):
+            results[index] = {"employeeId": item.employeeId, "ok": False, "status": 404, "error": "Employee not found"}
+        else:
+            pending.append((index, item))
+        seen.add(item.employeeId)
+    
+    numbers = await sequences.allocate("attendance", len(pending)) if pending else []
+    records = [
+        (index, AttendanceRecord(
+            id=format_id("ATT", number, width=8),
+            employeeId=item.employeeId,
+            date=now.strftime("%Y-%m-%d"),
+            timeIn=now.isoformat(),
+            notes=item.notes
+        ))
+        for (index, item), number in zip(pending, numbers)
+    ]
+    
+    # One insert claims every open shift; the unique _id rejects those already clocked in
+    rejected = await open_shifts.claim_many([(record.employeeId, record.id, record.timeIn) for _, record in records])
+    claimed = []
+    for index, record in records:
+        if record.employeeId in rejected:
+            results[index] = {"employeeId": record.employeeId, "ok": False, "status": 400, "error": rejected[record.employeeId]}
+        else:
+            claimed.append((index, record))
+    
+    failed_inserts = {}
+    if claimed:
+        try:
+            await db.attendance.insert_many([record.dict() for _, record in claimed], ordered=False)
+        except BulkWriteError as e:
+            failed_inserts = {error["index"]: error.get("errmsg", "Write failed") for error in e.details.get("writeErrors", [])}
+            await open_shifts.release_many(
+                (claimed[position][1].employeeId, claimed[position][1].id) for position in failed_inserts
+            )
+        except BaseException:
+            await asyncio.shield(open_shifts.release_orphans((record.employeeId, record.id) for _, record in claimed))
+            raise
+    for position, (index, record) in enumerate(claimed):
+        if position in failed_inserts:
+            results[index] = {"employeeId": record.employeeId, "ok": False, "status": 500, "error": failed_inserts[position]}
+        else:
+            results[index] = {"employeeId": record.employeeId, "ok": True, "record": record.dict()}
+            await publish_clock_in(record)
+    
+    return batch_response(results)
+
+@api_router.post("/attendance/clock-out/batch")
+async def clock_out_batch(
+    request: ClockOutBatchRequest,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """
+    Clock out several open shifts at once: one $in read, then one guarded
+    update per shift, run concurrently, with a shared timeOut. Results are per
+    item, in request order.
+    """
+    check_batch_size(request.items)
+    now = datetime.now(PH_TZ)
+    time_out = now.isoformat()
+    
+    record_ids = [item.recordId for item in request.items]
+    records = {
+        rec["id"]: rec
+        for rec in await db.attendance.find({"id": {"$in": record_ids}}, {"_id": 0}).to_list(None)
+    }
+    
+    results = [None] * len(request.items)
+    updates = {}  # record id -> (index, record, changes)
+    for index, item in enumerate(request.items):
+        record = records.get(item.recordId)
+        if item.recordId in updates:
+            results[index] = {"recordId": item.recordId, "ok": False, "status": 400, "error": "Duplicate record in batch"}
+        elif not record:
+            results[index] = {"recordId": item.recordId, "ok": False, "status": 404, "error": "Attendance record not found"}
+        elif record.get("timeOut"):
+            results[index] = {"recordId": item.recordId, "ok": False, "status": 400, "error": "Already clocked out"}
+        else:
+            time_in = datetime.fromisoformat(record["timeIn"].replace('Z', '+00:00'))
+            regular_hours = round((now - time_in).total_seconds() / 3600, 2)
+            updates[item.recordId] = (index, record, {
+                "timeOut": time_out,
+                "regularHours": regular_hours,
+                "totalHours": regular_hours + record.get("overtimeHours", 0.0),
+                "notes": item.notes,
+                "status": "COMPLETE",
+                "updatedAt": now
+            })
+    
+    # Guarded on timeOut so a shift closed concurrently is not closed twice. Each
+    # update returns the document it actually closed, and only those documents
+    # feed daily_hours: the pre-read above may already be out of date.
+    befores = await asyncio.gather(*(
+        db.attendance.find_one_and_update(
+            {"id": record_id, "timeOut": None},
+            {"$set": changes},
+            projection={"_id": 0},
+            return_document=ReturnDocument.BEFORE
+        )
+        for record_id, (_, _, changes) in updates.items()
+    ))
+    
+    closed = []  # (before, changes) of the shifts this call closed
+    for (record_id, (index, _, changes)), before in zip(updates.items(), befores):
+        if before is None:
+            results[index] = {"recordId": record_id, "ok": False, "status": 400, "error": "Already clocked out"}
+        else:
+            closed.append((before, changes))
+            results[index] = {"recordId": record_id, "ok": True, "record": AttendanceRecord(**{**before, **changes}).dict()}
+    
+    await record_attendance_changes((record, {**record, **changes}) for record, changes in closed)
+    await open_shifts.release_many((record["employeeId"], record["id"]) for record, _ in closed)
+    for record, changes in closed:
+        await publish_clock_out(record, changes)
+        audit_log = AuditLog(
+            action="CLOCK_OUT",
+            performedBy=current_admin["username"],
+            targetId=record["id"],
+            beforeValues={"timeOut": None},
+            afterValues={"timeOut": time_out, "regularHours": changes["regularHours"], "totalHours": changes["totalHours"]}
+        )
+        await audit_sink.emit(audit_log.dict())
+    
+    return batch_response(results)
 
 @api_router.put("/attendance/{record_id}", response_model=AttendanceRecord)
 async def update_attendance(
@@ -735,30 +1302,87 @@ async def update_attendance(
         time_out = datetime.fromisoformat(attendance_update.timeOut.replace('Z', '+00:00'))
         regular_hours = round((time_out - time_in).total_seconds() / 3600, 2)
         total_hours = regular_hours + overtime_hours
+    elif record.get("timeOut"):
+        # Clearing timeOut reopens the shift, which must stay unique per employee
+        if not await open_shifts.claim(record["employeeId"], record_id, attendance_update.timeIn):
+            raise HTTPException(status_code=400, detail="Employee is already clocked in")
     
-    await db.attendance.update_one(
-        {"id": record_id},
-        {
-            "$set": {
-                "timeIn": attendance_update.timeIn,
-                "timeOut": attendance_update.timeOut,
-                "regularHours": regular_hours,
-                "overtimeHours": overtime_hours,
-                "totalHours": total_hours,
-                "notes": attendance_update.notes,
-                "updatedAt": datetime.now(PH_TZ)
-            }
-        }
+    changes = {
+        "timeIn": attendance_update.timeIn,
+        "timeOut": attendance_update.timeOut,
+        "regularHours": regular_hours,
+        "overtimeHours": overtime_hours,
+        "totalHours": total_hours,
+        "notes": attendance_update.notes,
+        "updatedAt": datetime.now(PH_TZ)
+    }
+    before = await db.attendance.find_one_and_update(
+        {"id": record_id}, {"$set": changes}, return_document=ReturnDocument.BEFORE
     )
+    if before is None:
+        # Deleted since it was read; give back a shift claimed for reopening it
+        if not attendance_update.timeOut and record.get("timeOut"):
+            await open_shifts.release(record["employeeId"], record_id)
+        raise HTTPException(status_code=404, detail="Attendance record not found")
+    await record_attendance_changes([(before, {**before, **changes})])
+    
+    if attendance_update.timeOut and not record.get("timeOut"):
+        await open_shifts.release(record["employeeId"], record_id)
     
     updated_record = await db.attendance.find_one({"id": record_id})
     return AttendanceRecord(**updated_record)
 
 @api_router.get("/attendance/clocked-in")
 async def get_clocked_in_employees(current_admin: dict = Depends(get_current_admin)):
-    records = await db.attendance.find({"timeOut": None}).to_list(1000)
-    employee_ids = [rec["employeeId"] for rec in records]
-    return {"employeeIds": employee_ids}
+    # Served from the in-memory open shift registry
+    return {"employeeIds": open_shifts.employee_ids()}
+
+
+# ============================================================================
+# EVENT STREAM (PROTECTED)
+# ============================================================================
+
+@api_router.post("/events/token")
+async def create_events_token(current_admin: dict = Depends(get_current_admin)):
+    """
+    Short-lived token for EventSource(`/api/events?token=...`); fetch a new
+    one before each (re)connect
+    """
+    return {"token": create_stream_token(current_admin), "expiresIn": EVENTS_TOKEN_SECONDS}
+
+@api_router.get("/events")
+async def stream_events(request: Request, current_admin: dict = Depends(get_stream_admin)):
+    """
+    Server-Sent Events: a snapshot of who is clocked in, then clock-in,
+    clock-out, correction-request and correction-review events as they
+    happen. A client that falls behind is disconnected and should reconnect.
+    """
+    subscription = event_hub.subscribe()
+    
+    async def generate():
+        try:
+            yield format_sse({"id": "0", "type": "snapshot", "data": {"employeeIds": open_shifts.employee_ids()}})
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                if event is DROPPED:
+                    if subscription.dropped:
+                        yield format_sse({"id": "0", "type": "dropped", "data": {"reason": "Client fell behind; reconnect"}})
+                    return
+                yield format_sse(event)
+        finally:
+            event_hub.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 # ============================================================================
@@ -812,13 +1436,28 @@ async def create_correction_request(
         },
         reason=request.reason
     )
-    await db.audit_logs.insert_one(audit_log.dict())
+    await audit_sink.emit(audit_log.dict())
     
+    await event_hub.publish("correction-request", {
+        "requestId": correction.id,
+        "attendanceId": correction.attendanceId,
+        "requestedBy": correction.requestedBy
+    })
     return correction
 
-@api_router.get("/correction-requests", response_model=List[CorrectionRequest])
+async def publish_correction_review(correction: dict, review_status: str, reviewed_by: str):
+    await event_hub.publish("correction-review", {
+        "requestId": correction["id"],
+        "attendanceId": correction["attendanceId"],
+        "status": review_status,
+        "reviewedBy": reviewed_by
+    })
+
+@api_router.get("/correction-requests", response_model=CorrectionRequestPage)
 async def get_correction_requests(
     status: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_admin: dict = Depends(get_current_admin)
 ):
     query = {}
@@ -831,8 +1470,10 @@ async def get_correction_requests(
     if status:
         query["status"] = status
     
-    requests = await db.correction_requests.find(query).to_list(1000)
-    return [CorrectionRequest(**req) for req in requests]
+    requests, next_cursor = await fetch_page_or_400(
+        db.correction_requests, query, CORRECTION_REQUEST_SORT, limit, cursor, model_projection(CorrectionRequest)
+    )
+    return list_response(CorrectionRequest, requests, next_cursor)
 
 @api_router.post("/correction-requests/{request_id}/review")
 async def review_correction_request(
@@ -861,23 +1502,36 @@ async def review_correction_request(
     if review.action.lower() == "approve":
         # Update the attendance record
         attendance = await db.attendance.find_one({"id": correction["attendanceId"]})
+        if not attendance:
+            raise HTTPException(status_code=404, detail="Attendance record not found")
+        
+        # Approving a correction can reopen or close the shift; keep open_shifts in step
+        reopens = bool(attendance.get("timeOut")) and not correction["requestedTimeOut"]
+        closes = not attendance.get("timeOut") and bool(correction["requestedTimeOut"])
+        if reopens and not await open_shifts.claim(attendance["employeeId"], attendance["id"], correction["requestedTimeIn"]):
+            raise HTTPException(status_code=400, detail="Employee is already clocked in")
         
         # Calculate new total hours
         time_in = datetime.fromisoformat(correction["requestedTimeIn"].replace('Z', '+00:00'))
         time_out = datetime.fromisoformat(correction["requestedTimeOut"].replace('Z', '+00:00')) if correction["requestedTimeOut"] else None
         total_hours = round((time_out - time_in).total_seconds() / 3600, 2) if time_out else None
         
-        await db.attendance.update_one(
-            {"id": correction["attendanceId"]},
-            {
-                "$set": {
-                    "timeIn": correction["requestedTimeIn"],
-                    "timeOut": correction["requestedTimeOut"],
-                    "totalHours": total_hours,
-                    "updatedAt": now
-                }
-            }
+        changes = {
+            "timeIn": correction["requestedTimeIn"],
+            "timeOut": correction["requestedTimeOut"],
+            "totalHours": total_hours,
+            "updatedAt": now
+        }
+        before = await db.attendance.find_one_and_update(
+            {"id": correction["attendanceId"]}, {"$set": changes}, return_document=ReturnDocument.BEFORE
         )
+        if before is None:
+            if reopens:
+                await open_shifts.release(attendance["employeeId"], attendance["id"])
+            raise HTTPException(status_code=404, detail="Attendance record not found")
+        await record_attendance_changes([(before, {**before, **changes})])
+        if closes:
+            await open_shifts.release(attendance["employeeId"], attendance["id"])
         
         # Update correction request
         await db.correction_requests.update_one(
@@ -909,7 +1563,8 @@ async def review_correction_request(
             },
             reason=correction["reason"]
         )
-        await db.audit_logs.insert_one(audit_log.dict())
+        await audit_sink.emit(audit_log.dict(), durable=True)
+        await publish_correction_review(correction, "APPROVED", current_admin["username"])
         
         return {"message": "Correction request approved", "status": "APPROVED"}
     
@@ -934,40 +1589,191 @@ async def review_correction_request(
             targetId=request_id,
             reason=review.reviewNotes or "Request rejected"
         )
-        await db.audit_logs.insert_one(audit_log.dict())
+        await audit_sink.emit(audit_log.dict(), durable=True)
+        await publish_correction_review(correction, "REJECTED", current_admin["username"])
         
         return {"message": "Correction request rejected", "status": "REJECTED"}
     
     else:
         raise HTTPException(status_code=400, detail="Invalid action. Use 'approve' or 'reject'")
 
-@api_router.get("/audit-logs", response_model=List[AuditLog])
+def parse_audit_bound(value: Optional[str], end_of_day: bool = False) -> Optional[datetime]:
+    """
+    ISO date or datetime from a query string; naive values are Philippines time
+    and a bare date used as an upper bound covers the whole day
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {value}")
+    if end_of_day and len(value) == 10:
+        parsed += timedelta(days=1) - timedelta(microseconds=1)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=PH_TZ)
+    return parsed
+
+@api_router.get("/audit-logs", response_model=AuditLogPage)
 async def get_audit_logs(
+    from_: Optional[str] = Query(None, alias="from"),
+    to: Optional[str] = None,
+    performedBy: Optional[str] = None,
     targetId: Optional[str] = None,
     action: Optional[str] = None,
-    limit: int = 100,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    includeArchived: bool = False,
     current_admin: dict = Depends(get_current_admin)
 ):
+    """
+    Audit entries newest first. Only the monthly partitions overlapping
+    [from, to] are read; includeArchived also searches archived months.
+    """
     # Only admins can view audit logs
     if current_admin.get("role") != "admin":
         raise HTTPException(status_code=403, detail="Only admins can view audit logs")
     
-    query = {}
+    filters = {}
+    if performedBy:
+        filters["performedBy"] = performedBy
     if targetId:
-        query["targetId"] = targetId
+        filters["targetId"] = targetId
     if action:
-        query["action"] = action
+        filters["action"] = action
+    
+    try:
+        logs, next_cursor = await audit_store.query(
+            start=parse_audit_bound(from_),
+            end=parse_audit_bound(to, end_of_day=True),
+            filters=filters,
+            limit=limit,
+            cursor=cursor,
+            include_archived=includeArchived
+        )
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return list_response(AuditLog, logs, next_cursor)
+
+@api_router.post("/admin/audit-logs/archive")
+async def archive_audit_logs(
+    olderThanMonths: int = Query(6, ge=1),
+    current_admin: dict = Depends(get_current_admin)
+):
+    """
+    Compact audit partitions older than N months into gzip JSONL files
+    """
+    if current_admin.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can archive audit logs")
     
-    logs = await db.audit_logs.find(query).sort("timestamp", -1).limit(limit).to_list(limit)
-    return [AuditLog(**log) for log in logs]
+    return {"archived": await audit_store.archive(olderThanMonths)}
+
+
 
 
+# ============================================================================
+# ANALYTICS ROUTES (PROTECTED)
+# ============================================================================
+
+@api_router.get("/analytics/summary")
+async def get_analytics_summary(
+    startDate: str,
+    endDate: str,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """
+    Dashboard summary for a date range: hours per day and per role and
+    overtime totals, plus two current figures that ignore the range: pending
+    corrections and who is clocked in right now
+    """
+    if startDate > endDate:
+        raise HTTPException(status_code=400, detail="startDate must not be after endDate")
+    
+    key = (startDate, endDate)
+    summary = analytics_cache.get(key)
+    if summary is None:
+        facets = await db.daily_hours.aggregate(summary_pipeline(startDate, endDate)).to_list(1)
+        summary = {
+            "period": {"start": startDate, "end": endDate},
+            **shape_summary(facets[0] if facets else {"byDay": [], "byRole": []}),
+            "generatedAt": datetime.now(PH_TZ).isoformat()
+        }
+        analytics_cache.put(key, summary)
+    
+    # The whole correction backlog, not just requests made inside the range
+    pending = await db.correction_requests.count_documents({"status": "PENDING"})
+    # Served from the in-memory open shift registry, so always current
+    return {**summary, "pendingCorrections": pending, "clockedIn": len(open_shifts.employee_ids())}
 
 
 # ============================================================================
-# PAYROLL CALCULATION WITH SSS DEDUCTION
+# PAYROLL CALCULATION WITH STATUTORY DEDUCTIONS (see payroll_engine.py, deductions.py)
 # ============================================================================
 
+class PayrollRunRequest(BaseModel):
+    startDate: str
+    endDate: str
+    roleId: Optional[str] = None
+    status: Optional[str] = None
+
+def build_payroll_hours_pipeline(
+    startDate: str,
+    endDate: str,
+    hours_match: Optional[dict] = None,
+    employee_match: Optional[dict] = None
+) -> list:
+    """
+    Sum the daily_hours aggregates per employee for a period and join the
+    employee fields payroll needs, so the whole period costs a single round trip
+    """
+    match = {
+        "date": {"$gte": startDate, "$lte": endDate},
+        "shifts": {"$gt": 0}
+    }
+    if hours_match:
+        match.update(hours_match)
+    
+    pipeline = [
+        {"$match": match},
+        {
+            "$group": {
+                "_id": "$employeeId",
+                "regularHours": {"$sum": "$regularHours"},
+                "overtimeHours": {"$sum": "$overtimeHours"},
+                "daysWorked": {"$sum": "$shifts"}
+            }
+        },
+        {
+            "$lookup": {
+                "from": "employees",
+                "localField": "_id",
+                "foreignField": "id",
+                "as": "employee"
+            }
+        },
+        {"$unwind": "$employee"},
+    ]
+    if employee_match:
+        pipeline.append({"$match": {f"employee.{k}": v for k, v in employee_match.items()}})
+    pipeline.extend([
+        {
+            "$project": {
+                "_id": 0,
+                "employeeId": "$_id",
+                "employeeName": "$employee.fullName",
+                "payRate": "$employee.payRate",
+                "sssEnabled": {"$ifNull": ["$employee.sssEnabled", True]},
+                "philhealthEnabled": {"$ifNull": ["$employee.philhealthEnabled", True]},
+                "pagibigEnabled": {"$ifNull": ["$employee.pagibigEnabled", True]},
+                "regularHours": 1,
+                "overtimeHours": 1,
+                "daysWorked": 1
+            }
+        },
+        {"$sort": {"employeeId": 1}}
+    ])
+    return pipeline
+
 @api_router.get("/payroll/calculate")
 async def calculate_payroll(
     employeeId: str,
@@ -976,69 +1782,103 @@ async def calculate_payroll(
     current_admin: dict = Depends(get_current_admin)
 ):
     """
-    Calculate payroll for an employee including SSS deduction
+    Calculate payroll for an employee including SSS, PhilHealth and Pag-IBIG
+    deductions from the tables in force at the end of the period
     """
     # Get employee
-    employee = await db.employees.find_one({"id": employeeId})
+    employee = await directory.employee(employeeId)
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
     
-    # Get attendance records for the period
-    records = await db.attendance.find({
-        "employeeId": employeeId,
-        "date": {"$gte": startDate, "$lte": endDate},
-        "status": "COMPLETE"
-    }).to_list(1000)
+    # Read the version before the hours, so a concurrent write can only make this entry miss
+    tables = deduction_registry.tables_for(endDate)
+    cache_key = (employeeId, startDate, endDate, tables_version(tables))
+    version = await payroll_cache.version(employeeId)
+    cached = payroll_cache.get(cache_key, version, employee)
+    if cached is not None:
+        return cached
     
-    # Calculate hours and gross pay
-    total_regular_hours = sum(r.get("regularHours", 0) for r in records)
-    total_overtime_hours = sum(r.get("overtimeHours", 0) for r in records)
-    hourly_rate = employee["payRate"]
-    overtime_rate = hourly_rate * 1.25  # 25% premium for overtime
+    # Sum the period's daily hours server-side
+    pipeline = build_payroll_hours_pipeline(startDate, endDate, hours_match={"employeeId": employeeId})
+    rows = await db.daily_hours.aggregate(pipeline).to_list(1)
+    row = rows[0] if rows else {"regularHours": 0, "overtimeHours": 0, "daysWorked": 0}
     
-    regular_pay = total_regular_hours * hourly_rate
-    overtime_pay = total_overtime_hours * overtime_rate
-    gross_pay = regular_pay + overtime_pay
+    result = compute_payroll(
+        [employee["payRate"]],
+        [row["regularHours"]],
+        [row["overtimeHours"]],
+        tables,
+        {kind: [employee.get(f"{kind}Enabled", True)] for kind in DEDUCTION_KINDS}
+    )
+    entry = payroll_entries(
+        [employeeId],
+        [employee["fullName"]],
+        [row["daysWorked"]],
+        result,
+        startDate,
+        endDate
+    )[0]
+    payroll_cache.put(cache_key, version, employee, entry)
+    return entry
+
+@api_router.post("/payroll/run")
+async def run_payroll(
+    request: PayrollRunRequest,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """
+    Calculate payroll for every employee with completed attendance in the period
+    """
+    employee_match = {}
+    if request.roleId:
+        employee_match["roleId"] = request.roleId
+    if request.status:
+        employee_match["status"] = request.status
     
-    # Calculate monthly salary for SSS (assuming 4 weeks)
-    hours_per_day = 8
-    days_per_month = 26  # Standard working days
-    monthly_hours = hours_per_day * days_per_month
-    estimated_monthly_salary = hourly_rate * monthly_hours
+    pipeline = build_payroll_hours_pipeline(request.startDate, request.endDate, employee_match=employee_match)
+    rows = await db.daily_hours.aggregate(pipeline).to_list(None)
     
-    # Calculate SSS contribution
-    sss_data = calculate_sss_contribution(estimated_monthly_salary)
+    tables = deduction_registry.tables_for(request.endDate)
+    result = compute_payroll(
+        [row["payRate"] for row in rows],
+        [row["regularHours"] for row in rows],
+        [row["overtimeHours"] for row in rows],
+        tables,
+        {kind: [row[f"{kind}Enabled"] for row in rows] for kind in DEDUCTION_KINDS}
+    )
+    entries = payroll_entries(
+        [row["employeeId"] for row in rows],
+        [row["employeeName"] for row in rows],
+        [row["daysWorked"] for row in rows],
+        result,
+        request.startDate,
+        request.endDate
+    )
     
-    # Calculate net pay
-    net_pay = gross_pay - sss_data["employee_share"]
+    totals = {
+        "employees": len(entries),
+        "gross": round(float(result["gross_pay"].sum()), 2)
+    }
+    for kind in tables:
+        totals[f"{kind}_employee"] = round(float(result[f"{kind}_employee"].sum()), 2)
+        totals[f"{kind}_employer"] = round(float(result[f"{kind}_employer"].sum()), 2)
+    totals["total_deductions"] = round(float(result["total_deductions"].sum()), 2)
+    totals["net_pay"] = round(float(result["net_pay"].sum()), 2)
     
     return {
-        "employeeId": employeeId,
-        "employeeName": employee["fullName"],
-        "period": {"start": startDate, "end": endDate},
-        "hours": {
-            "regular": total_regular_hours,
-            "overtime": total_overtime_hours,
-            "total": total_regular_hours + total_overtime_hours
-        },
-        "rates": {
-            "hourly": hourly_rate,
-            "overtime": overtime_rate
-        },
-        "pay": {
-            "regular": round(regular_pay, 2),
-            "overtime": round(overtime_pay, 2),
-            "gross": round(gross_pay, 2)
-        },
-        "deductions": {
-            "sss_employee": sss_data["employee_share"],
-            "sss_employer": sss_data["employer_share"],
-            "total_deductions": sss_data["employee_share"]
-        },
-        "net_pay": round(net_pay, 2),
-        "days_worked": len(records)
+        "period": {"start": request.startDate, "end": request.endDate},
+        "deductionTables": {kind: table.effective_date for kind, table in tables.items()},
+        "employees": entries,
+        "totals": totals
     }
 
+@api_router.get("/payroll/deduction-tables")
+async def get_deduction_tables(current_admin: dict = Depends(get_current_admin)):
+    """
+    List the loaded statutory contribution tables and their effective dates
+    """
+    return deduction_registry.describe()
+
 
 # MIGRATION ENDPOINT - Import data from localStorage
 # ============================================================================
@@ -1047,65 +1887,215 @@ class MigrationData(BaseModel):
     employees: List[dict]
     attendance: List[dict]
 
-@api_router.post("/migrate")
-async def migrate_data(
-    data: MigrationData,
-    current_admin: dict = Depends(get_current_admin)
-):
+MIGRATION_CHUNK_SIZE = int(os.environ.get('MIGRATION_CHUNK_SIZE', 1000))
+
+async def ndjson_rows(stream):
+    """
+    Yield (line number, parsed object or error message) from a streamed NDJSON body
+    """
+    buffer = b""
+    line_no = 0
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if line.strip():
+                yield line_no, parse_ndjson_line(line)
+    if buffer.strip():
+        yield line_no + 1, parse_ndjson_line(buffer)
+
+def parse_ndjson_line(line: bytes):
     try:
-        # Migrate employees - need to convert role names to roleIds
-        role_map = {}
-        
-        # Extract unique role names from employees
-        unique_roles = set()
-        for emp in data.employees:
-            if "role" in emp:
-                unique_roles.add(emp["role"])
+        row = json.loads(line)
+    except ValueError as e:
+        return f"Invalid JSON: {e}"
+    if not isinstance(row, dict) or row.get("type") not in ("employee", "attendance") or not isinstance(row.get("data"), dict):
+        return 'Expected {"type": "employee" | "attendance", "data": {...}}'
+    return row
+
+class MigrationPipeline:
+    """
+    Validates imported rows in chunks and writes each chunk with one unordered
+    bulk_write of upserts keyed on id. Existing rows are left untouched.
+    """
+    
+    def __init__(self, chunk_size: int = MIGRATION_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.role_map = None  # role name key -> role id
+        self.pending = {"employee": [], "attendance": []}
+        self.chunks = []
+        self.invalid_lines = []
+        self.totals = {
+            kind: {"received": 0, "inserted": 0, "existing": 0, "failed": 0}
+            for kind in self.pending
+        }
+    
+    async def resolve_role(self, role_name: str) -> str:
+        if self.role_map is None:
+            roles = await db.roles.find({}, {"_id": 0, "id": 1, "name": 1}).to_list(None)
+            self.role_map = {role_name_key(role["name"]): role["id"] for role in roles}
+        key = role_name_key(role_name)
+        if key not in self.role_map:
+            new_role = Role(name=role_name.strip())
+            try:
+                await db.roles.insert_one(role_document(new_role))
+                self.role_map[key] = new_role.id
+            except DuplicateKeyError:
+                # Created concurrently since the map was loaded
+                existing = await db.roles.find_one({"nameKey": key}, {"_id": 0, "id": 1})
+                self.role_map[key] = existing["id"]
+        return self.role_map[key]
+    
+    async def add(self, kind: str, line_no: int, row: dict) -> None:
+        self.pending[kind].append((line_no, row))
+        if len(self.pending[kind]) >= self.chunk_size:
+            await self.flush(kind)
+    
+    async def finish(self) -> None:
+        for kind in self.pending:
+            await self.flush(kind)
+    
+    async def build_employee(self, emp: dict) -> dict:
+        if not emp.get("role"):
+            raise ValueError("Missing role")
+        employee = Employee(
+            id=emp["id"],
+            fullName=emp["fullName"],
+            email=emp["email"],
+            phone=emp["phone"],
+            address=emp["address"],
+            status=emp["status"],
+            roleId=await self.resolve_role(emp["role"]),
+            payType="Hourly",
+            payRate=emp.get("payRate", 0),
+            dateHired=emp["dateHired"],
+            sssEnabled=emp.get("sssEnabled", True),
+            philhealthEnabled=emp.get("philhealthEnabled", True),
+            pagibigEnabled=emp.get("pagibigEnabled", True)
+        )
+        return employee.dict()
+    
+    async def build_attendance(self, att: dict) -> dict:
+        return AttendanceRecord(**att).dict()
+    
+    async def flush(self, kind: str) -> None:
+        rows, self.pending[kind] = self.pending[kind], []
+        if not rows:
+            return
         
-        # Create roles if they don't exist
-        for role_name in unique_roles:
-            existing_role = await db.roles.find_one({"name": {"$regex": f"^{role_name}$", "$options": "i"}})
-            if existing_role:
-                role_map[role_name] = existing_role["id"]
-            else:
-                new_role = Role(name=role_name)
-                await db.roles.insert_one(new_role.dict())
-                role_map[role_name] = new_role.id
+        report = {
+            "chunk": len(self.chunks) + 1,
+            "type": kind,
+            "firstLine": rows[0][0],
+            "lastLine": rows[-1][0],
+            "received": len(rows),
+            "inserted": 0,
+            "existing": 0,
+            "errors": []
+        }
+        build = self.build_employee if kind == "employee" else self.build_attendance
+        collection = db.employees if kind == "employee" else db.attendance
         
-        # Migrate employees
-        for emp in data.employees:
-            role_id = role_map.get(emp.get("role", ""), None)
-            if not role_id:
+        operations = []
+        lines = []
+        docs = []
+        for line_no, row in rows:
+            try:
+                doc = await build(row)
+            except (KeyError, ValueError, TypeError) as e:
+                detail = f"Missing field {e}" if isinstance(e, KeyError) else str(e)
+                report["errors"].append({"line": line_no, "error": detail})
                 continue
-            
-            # Check if employee already exists
-            existing = await db.employees.find_one({"id": emp["id"]})
-            if not existing:
-                employee = Employee(
-                    id=emp["id"],
-                    fullName=emp["fullName"],
-                    email=emp["email"],
-                    phone=emp["phone"],
-                    address=emp["address"],
-                    status=emp["status"],
-                    roleId=role_id,
-                    payType="Hourly",
-                    payRate=emp.get("payRate", 0),
-                    dateHired=emp["dateHired"]
-                )
-                await db.employees.insert_one(employee.dict())
+            operations.append(UpdateOne({"id": doc["id"]}, {"$setOnInsert": doc}, upsert=True))
+            lines.append(line_no)
+            docs.append(doc)
         
-        # Migrate attendance records
-        for att in data.attendance:
-            existing = await db.attendance.find_one({"id": att["id"]})
-            if not existing:
-                record = AttendanceRecord(**att)
-                await db.attendance.insert_one(record.dict())
+        if operations:
+            try:
+                result = await collection.bulk_write(operations, ordered=False)
+                report["inserted"] = result.upserted_count
+                report["existing"] = result.matched_count
+                upserted = list(result.upserted_ids)
+            except BulkWriteError as e:
+                report["inserted"] = e.details.get("nUpserted", 0)
+                report["existing"] = e.details.get("nMatched", 0)
+                upserted = [item["index"] for item in e.details.get("upserted", [])]
+                for error in e.details.get("writeErrors", []):
+                    report["errors"].append({"line": lines[error["index"]], "error": error.get("errmsg", "Write failed")})
+            if kind == "attendance":
+                # Only newly inserted records add hours; existing ones were left untouched
+                await record_attendance_changes((None, docs[index]) for index in upserted)
         
-        return {"message": "Migration completed successfully"}
-    except Exception as e:
-        logger.error(f"Migration error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Migration failed: {str(e)}")
+        totals = self.totals[kind]
+        totals["received"] += report["received"]
+        totals["inserted"] += report["inserted"]
+        totals["existing"] += report["existing"]
+        totals["failed"] += len(report["errors"])
+        self.chunks.append(report)
+        logger.info(
+            f"Migration chunk {report['chunk']} ({kind}): {report['inserted']} inserted, "
+            f"{report['existing']} existing, {len(report['errors'])} failed"
+        )
+
+# The body is read by hand (JSON or streamed NDJSON), so describe it for the docs
+MIGRATION_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": MigrationData.schema()},
+            "application/x-ndjson": {
+                "schema": {
+                    "type": "string",
+                    "description": 'One {"type": "employee" | "attendance", "data": {...}} object per line'
+                }
+            },
+        },
+    }
+}
+
+@api_router.post("/migrate", openapi_extra=MIGRATION_REQUEST_BODY)
+async def migrate_data(
+    request: Request,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """
+    Import employees and attendance. Accepts either the JSON body
+    {"employees": [...], "attendance": [...]} or a streamed
+    application/x-ndjson upload with one {"type", "data"} object per line.
+    """
+    pipeline = MigrationPipeline()
+    
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        async for line_no, row in ndjson_rows(request.stream()):
+            if isinstance(row, str):
+                pipeline.invalid_lines.append({"line": line_no, "error": row})
+                continue
+            await pipeline.add(row["type"], line_no, row["data"])
+    else:
+        try:
+            # parse_obj rejects valid JSON that is not an object (e.g. [1, 2]) with a 422
+            data = MigrationData.parse_obj(await request.json())
+        except (ValueError, ValidationError) as e:
+            raise HTTPException(status_code=422, detail=f"Invalid migration body: {e}")
+        # Employees first so their roles are resolved before attendance arrives
+        for i, emp in enumerate(data.employees):
+            await pipeline.add("employee", i + 1, emp)
+        for i, att in enumerate(data.attendance):
+            await pipeline.add("attendance", i + 1, att)
+    await pipeline.finish()
+    
+    # Imported ids must never be handed out again; imported attendance may include open shifts
+    await sync_id_sequences()
+    await open_shifts.reconcile()
+    await directory.invalidate()
+    
+    return {
+        "message": "Migration completed",
+        "totals": pipeline.totals,
+        "chunks": pipeline.chunks,
+        "invalidLines": pipeline.invalid_lines
+    }
 
 
 # Include the router in the main app
@@ -1119,6 +2109,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if PROFILING_ENABLED:
+    app.add_middleware(ProfileMiddleware, store=profile_store, authorize=can_profile)
+app.add_middleware(RouteContextMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+async def authorize_metrics(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """
+    Accept the configured METRICS_TOKEN, or an admin session token
+    """
+    if METRICS_TOKEN and secrets.compare_digest(credentials.credentials, METRICS_TOKEN):
+        return
+    admin = await authenticate_token(credentials.credentials)
+    if admin.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can read metrics")
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(authorize_metrics)])
+async def metrics():
+    """
+    Prometheus scrape endpoint. Route names, traffic and error rates are not
+    public: scrape with `authorization: {credentials: <METRICS_TOKEN>}`.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    event_hub.close()
+    if event_hub.relay:
+        await event_hub.relay.stop()
+    await open_shifts.stop()
+    await audit_sink.close()
     client.close()
+    password_hasher.shutdown()
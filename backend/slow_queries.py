@@ -0,0 +1,276 @@
+"""
+Slow Mongo operation log (GET /api/admin/slow-queries).
+
+SlowQueryLog is a pymongo CommandListener: any command slower than the
+threshold is recorded with its collection, its filter/pipeline shape with
+values replaced by "?", a fingerprint of that shape, the documents it
+returned and the route that issued it. RouteContextMiddleware puts the ASGI
+scope in a contextvar; Motor runs each operation in its executor under a copy
+of the caller's context, so the listener thread sees the request that
+triggered the command. Commands run outside a request (startup backfills,
+the audit sink) are attributed to "<background>".
+
+Records go into a bounded ring buffer and, when a path is configured, are
+appended to a JSONL file. With explain enabled, slow reads are re-run once
+per shape per minute through explain(executionStats) in the background to
+fill in docsExamined; this costs a second execution, so leave it off unless
+investigating.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import monitoring
+from pymongo.errors import PyMongoError
+
+from metrics import command_collection, returned_documents
+
+logger = logging.getLogger(__name__)
+
+current_request: ContextVar[Optional[dict]] = ContextVar("current_request", default=None)
+
+BACKGROUND = "<background>"
+
+# Commands explain can re-run without side effects
+EXPLAINABLE = {"find", "aggregate", "count", "distinct"}
+
+# Session and routing fields the driver adds, which explain does not accept
+DRIVER_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction", "readConcern", "writeConcern"}
+
+EXPLAIN_INTERVAL_SECONDS = 60
+
+
+class RouteContextMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = current_request.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_request.reset(token)
+
+
+def route_label(scope: Optional[dict]) -> str:
+    if scope is None:
+        return BACKGROUND
+    # Routing has normally happened by the time the endpoint queries Mongo
+    route = scope.get("route")
+    return f"{scope['method']} {getattr(route, 'path', scope['path'])}"
+
+
+def value_shape(value):
+    """
+    Keep keys and operators, replace every value with "?"
+    """
+    if isinstance(value, dict):
+        return {key: value_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)) and value and all(isinstance(item, dict) for item in value):
+        return [value_shape(item) for item in value]
+    return "?"
+
+
+def command_shape(command_name: str, command) -> dict:
+    if command_name == "find":
+        return {"filter": value_shape(command.get("filter", {})), "sort": command.get("sort")}
+    if command_name == "aggregate":
+        return {"pipeline": value_shape(command.get("pipeline", []))}
+    if command_name in ("count", "findAndModify"):
+        return {"filter": value_shape(command.get("query", {})), "sort": command.get("sort")}
+    if command_name == "distinct":
+        return {"key": command.get("key"), "filter": value_shape(command.get("query", {}))}
+    if command_name in ("update", "delete"):
+        statements = command.get(command_name + "s") or [{}]
+        return {"filter": value_shape(statements[0].get("q", {})), "statements": len(statements)}
+    return {}
+
+
+def fingerprint(collection: str, command_name: str, shape: dict) -> str:
+    key = json.dumps([collection, command_name, shape], default=str)
+    return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+
+def find_docs_examined(explain) -> Optional[int]:
+    """
+    totalDocsExamined from explain output; aggregate explains nest it per stage
+    """
+    if isinstance(explain, dict):
+        if "totalDocsExamined" in explain:
+            return explain["totalDocsExamined"]
+        items = explain.values()
+    elif isinstance(explain, list):
+        items = explain
+    else:
+        return None
+    for item in items:
+        found = find_docs_examined(item)
+        if found is not None:
+            return found
+    return None
+
+
+class SlowQueryLog(monitoring.CommandListener):
+    def __init__(
+        self,
+        threshold_ms: float = 100,
+        capacity: int = 200,
+        jsonl_path: Optional[Path] = None,
+        explain: bool = False,
+        ignore_collections: Iterable[str] = ()
+    ):
+        self.threshold_ms = threshold_ms
+        self.jsonl_path = Path(jsonl_path) if jsonl_path else None
+        self.explain = explain
+        self.ignore_collections = set(ignore_collections)
+        self._records: deque = deque(maxlen=capacity)
+        self._pending: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self._explained_at: Dict[str, float] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client = None
+        self.recorded = 0
+
+    def attach(self, loop: asyncio.AbstractEventLoop, client) -> None:
+        """
+        Give the log a loop and client for background explains
+        """
+        self._loop = loop
+        self._client = client
+
+    # ------------------------------------------------------------------------
+    # Listener callbacks (run on Motor's executor threads)
+    # ------------------------------------------------------------------------
+
+    def started(self, event):
+        if event.command_name == "explain":
+            return
+        with self._lock:
+            self._pending[(event.request_id, event.operation_id)] = (event.command, current_request.get())
+
+    def succeeded(self, event):
+        self._finish(event, None)
+
+    def failed(self, event):
+        self._finish(event, event.failure)
+
+    def _finish(self, event, failure) -> None:
+        with self._lock:
+            pending = self._pending.pop((event.request_id, event.operation_id), None)
+        duration_ms = event.duration_micros / 1000
+        if pending is None or duration_ms < self.threshold_ms:
+            return
+        command, scope = pending
+        collection = command_collection(event.command_name, command)
+        if collection in self.ignore_collections:
+            return
+        shape = command_shape(event.command_name, command)
+        record = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "route": route_label(scope),
+            "database": event.database_name,
+            "collection": collection,
+            "command": event.command_name,
+            "durationMs": round(duration_ms, 2),
+            "shape": shape,
+            "fingerprint": fingerprint(collection, event.command_name, shape),
+            "docsReturned": None if failure else returned_documents(event.command_name, event.reply),
+            "docsExamined": None,
+            "error": str(failure.get("errmsg", failure)) if failure else None,
+        }
+        with self._lock:
+            self._records.append(record)
+            self.recorded += 1
+        if failure is None and self._should_explain(record):
+            asyncio.run_coroutine_threadsafe(self._explain(record, command), self._loop)
+        else:
+            self._write(record)
+
+    def _should_explain(self, record: dict) -> bool:
+        if not self.explain or self._loop is None or record["command"] not in EXPLAINABLE:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if now - self._explained_at.get(record["fingerprint"], float("-inf")) < EXPLAIN_INTERVAL_SECONDS:
+                return False
+            self._explained_at[record["fingerprint"]] = now
+        return True
+
+    async def _explain(self, record: dict, command) -> None:
+        explained = {key: value for key, value in command.items() if not key.startswith("$") and key not in DRIVER_FIELDS}
+        try:
+            result = await self._client[record["database"]].command(
+                {"explain": explained, "verbosity": "executionStats"}
+            )
+            record["docsExamined"] = find_docs_examined(result)
+        except PyMongoError as e:
+            logger.warning(f"Explain of slow {record['collection']}.{record['command']} failed: {e}")
+        await asyncio.to_thread(self._write, record)
+
+    def _write(self, record: dict) -> None:
+        if not self.jsonl_path:
+            return
+        line = json.dumps(record, default=str) + "\n"
+        with self._file_lock:
+            with open(self.jsonl_path, "a") as f:
+                f.write(line)
+
+    # ------------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------------
+
+    def recent(self, limit: int = 50, collection: Optional[str] = None) -> List[dict]:
+        with self._lock:
+            records = list(self._records)
+        records.reverse()
+        if collection:
+            records = [record for record in records if record["collection"] == collection]
+        return records[:limit]
+
+    def by_shape(self) -> List[dict]:
+        """
+        Buffered records grouped by fingerprint, most total time first
+        """
+        with self._lock:
+            records = list(self._records)
+        groups: Dict[str, dict] = {}
+        for record in records:
+            group = groups.setdefault(record["fingerprint"], {
+                "fingerprint": record["fingerprint"],
+                "collection": record["collection"],
+                "command": record["command"],
+                "shape": record["shape"],
+                "routes": [],
+                "count": 0,
+                "totalMs": 0.0,
+                "maxMs": 0.0,
+            })
+            group["count"] += 1
+            group["totalMs"] = round(group["totalMs"] + record["durationMs"], 2)
+            group["maxMs"] = max(group["maxMs"], record["durationMs"])
+            if record["route"] not in group["routes"]:
+                group["routes"].append(record["route"])
+        return sorted(groups.values(), key=lambda group: group["totalMs"], reverse=True)
+
+    def stats(self) -> dict:
+        return {
+            "thresholdMs": self.threshold_ms,
+            "recorded": self.recorded,
+            "buffered": len(self._records),
+            "capacity": self._records.maxlen,
+            "explain": self.explain,
+            "jsonlPath": str(self.jsonl_path) if self.jsonl_path else None,
+        }
@@ -82,6 +82,27 @@ def make_request(method: str, endpoint: str, data: Dict[Any, Any] = None,
         print(f"❌ Request failed: {method.upper()} {endpoint} - {str(e)}")
         raise
 
+def fetch_all_pages(endpoint: str, params: Dict[str, Any] = None, page_size: int = 2) -> Optional[list]:
+    """Follow nextCursor through a paged list endpoint; None if a page fails"""
+    items = []
+    cursor = None
+    while True:
+        page_params = dict(params or {}, limit=page_size)
+        if cursor:
+            page_params["cursor"] = cursor
+        response = make_request("GET", endpoint, params=page_params, use_auth=True)
+        if response.status_code != 200:
+            result.failure(f"GET {endpoint} page failed with status {response.status_code}", response.text)
+            return None
+        data = response.json()
+        if len(data["items"]) > page_size:
+            result.failure(f"GET {endpoint} returned more than limit={page_size} items", str(len(data["items"])))
+            return None
+        items.extend(data["items"])
+        cursor = data["nextCursor"]
+        if not cursor:
+            return items
+
 def test_authentication_flow():
     """Test complete authentication flow"""
     global auth_token
@@ -288,7 +309,7 @@ def test_role_management():
         response = make_request("GET", "/roles", params={"activeOnly": "true"}, use_auth=True)
         
         if response.status_code == 200:
-            roles = response.json()
+            roles = response.json()["items"]
             cashier_in_results = any(role["name"] == "Cashier" for role in roles)
             if not cashier_in_results:
                 result.success("GET /roles?activeOnly=true correctly excludes inactive Cashier")
@@ -465,6 +486,44 @@ def test_attendance_management():
         except Exception as e:
             result.failure("Clock-out request failed", str(e))
 
+def test_list_pagination():
+    """Test the paged list endpoints ({items, nextCursor})"""
+    print("\n📄 TESTING LIST PAGINATION")
+    print("-" * 40)
+    
+    endpoints = ["/roles", "/attendance", "/correction-requests", "/audit-logs"]
+    for i, endpoint in enumerate(endpoints, 1):
+        print(f"\n{i}. Paging through GET {endpoint}")
+        try:
+            response = make_request("GET", endpoint, use_auth=True)
+            if response.status_code != 200:
+                result.failure(f"GET {endpoint} failed with status {response.status_code}", response.text)
+                continue
+            everything = response.json()["items"]
+            paged = fetch_all_pages(endpoint)
+            if paged is None:
+                continue
+            paged_ids = [item["id"] for item in paged]
+            if len(paged_ids) != len(set(paged_ids)):
+                result.failure(f"GET {endpoint} pages contain duplicates", str(paged_ids))
+            elif paged_ids[:len(everything)] != [item["id"] for item in everything]:
+                result.failure(f"GET {endpoint} pages skipped or reordered items",
+                             f"{len(paged_ids)} paged vs {len(everything)} in one page")
+            else:
+                result.success(f"GET {endpoint} paged through {len(paged_ids)} items without gaps")
+        except Exception as e:
+            result.failure(f"GET {endpoint} pagination request failed", str(e))
+    
+    print("\n5. Testing GET /attendance with an invalid cursor")
+    try:
+        response = make_request("GET", "/attendance", params={"cursor": "not-a-cursor"}, use_auth=True)
+        if response.status_code == 400:
+            result.success("Invalid cursor correctly rejected with 400")
+        else:
+            result.failure(f"Invalid cursor should return 400, got {response.status_code}", response.text)
+    except Exception as e:
+        result.failure("Invalid cursor test failed", str(e))
+
 def test_error_cases():
     """Test various error scenarios"""
     print("\n🚨 TESTING ERROR CASES")
@@ -532,6 +591,7 @@ def main():
             test_role_management()
             test_employee_management()
             test_attendance_management()
+            test_list_pagination()
         else:
             result.failure("Authentication failed - skipping protected endpoint tests", "")
         
@@ -0,0 +1,93 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+pytest.importorskip("fastapi")
+
+
+@pytest.fixture(scope="module")
+def server():
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "ems_test")
+    import motor.motor_asyncio
+
+    # server.py connects at import time; point it at an in-memory database
+    original = motor.motor_asyncio.AsyncIOMotorClient
+    motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+    try:
+        import server
+    finally:
+        motor.motor_asyncio.AsyncIOMotorClient = original
+    return server
+
+
+async def add_employee(server, employee_id):
+    await server.db.employees.insert_one({
+        "id": employee_id, "fullName": "E", "email": "e@example.com", "phone": "1", "address": "x",
+        "status": "Active", "roleId": "R1", "payRate": 100, "dateHired": "2024-01-01",
+    })
+    await server.directory.invalidate()
+
+
+def test_cancelled_insert_releases_the_claim(server, monkeypatch):
+    collection_type = type(server.db.attendance)
+    insert_one = collection_type.insert_one
+
+    async def cancelled_insert(self, document, *args, **kwargs):
+        if self.name == "attendance":
+            raise asyncio.CancelledError()
+        return await insert_one(self, document, *args, **kwargs)
+
+    async def scenario():
+        await add_employee(server, "EMP-901")
+        request = server.ClockInRequest(employeeId="EMP-901")
+        monkeypatch.setattr(collection_type, "insert_one", cancelled_insert)
+        with pytest.raises(asyncio.CancelledError):
+            await server.clock_in(request, {})
+        monkeypatch.setattr(collection_type, "insert_one", insert_one)
+        assert await server.db.open_shifts.find_one({"_id": "EMP-901"}) is None
+        return await server.clock_in(request, {})
+
+    record = asyncio.run(scenario())
+    assert record.employeeId == "EMP-901" and record.timeOut is None
+
+
+def test_abandoned_claim_is_cleared_after_grace(server):
+    async def scenario():
+        await add_employee(server, "EMP-902")
+        await add_employee(server, "EMP-903")
+        old = (datetime.now(timezone.utc) - timedelta(seconds=server.open_shifts.claim_grace_seconds + 5)).isoformat()
+        fresh = datetime.now(timezone.utc).isoformat()
+        # Claims from clock-ins that died before inserting their records
+        await server.db.open_shifts.insert_many([
+            {"_id": "EMP-902", "recordId": "ATT-LOST-1", "timeIn": old},
+            {"_id": "EMP-903", "recordId": "ATT-LOST-2", "timeIn": fresh},
+        ])
+        record = await server.clock_in(server.ClockInRequest(employeeId="EMP-902"), {})
+        with pytest.raises(server.HTTPException) as blocked:
+            await server.clock_in(server.ClockInRequest(employeeId="EMP-903"), {})
+        return record, blocked.value.status_code
+
+    record, status = asyncio.run(scenario())
+    assert record.employeeId == "EMP-902"
+    # Within the grace window the insert may still be on its way
+    assert status == 400
+
+
+def test_reconcile_drops_abandoned_claims(server):
+    async def scenario():
+        old = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+        fresh = datetime.now(timezone.utc).isoformat()
+        await server.db.open_shifts.insert_many([
+            {"_id": "EMP-904", "recordId": "ATT-LOST-3", "timeIn": old},
+            {"_id": "EMP-905", "recordId": "ATT-LOST-4", "timeIn": fresh},
+        ])
+        await server.open_shifts.reconcile()
+        return set(server.open_shifts.employee_ids())
+
+    open_ids = asyncio.run(scenario())
+    assert "EMP-904" not in open_ids
+    assert "EMP-905" in open_ids
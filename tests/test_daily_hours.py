@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+
+from daily_hours import HOURS_FIELDS, DailyHours, day_key
+
+
+@pytest.fixture
+def db():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    return mongomock_motor.AsyncMongoMockClient()["test"]
+
+
+def record(record_id, date="2024-03-01", regular=8.0, overtime=0.0, status="COMPLETE", employee="E1"):
+    return {
+        "id": record_id,
+        "employeeId": employee,
+        "date": date,
+        "status": status,
+        "regularHours": regular if status == "COMPLETE" else None,
+        "overtimeHours": overtime if status == "COMPLETE" else None,
+    }
+
+
+def deltas(db, changes):
+    """
+    Apply changes to an empty daily_hours and return {_id: hours} of what was written
+    """
+    async def apply():
+        await DailyHours(db).apply_many(changes)
+        return await db.daily_hours.find({}).to_list(None)
+
+    return {doc["_id"]: {field: doc[field] for field in HOURS_FIELDS} for doc in asyncio.run(apply())}
+
+
+def test_clock_out_adds_the_shift(db):
+    open_shift = record("A", status="OPEN")
+    assert deltas(db, [(None, open_shift)]) == {}
+    assert deltas(db, [(open_shift, record("A", regular=8, overtime=1.5))]) == {
+        day_key("E1", "2024-03-01"): {"regularHours": 8, "overtimeHours": 1.5, "shifts": 1}
+    }
+
+
+def test_edit_moves_only_the_difference(db):
+    assert deltas(db, [(record("A", regular=8, overtime=1), record("A", regular=7, overtime=1))]) == {
+        day_key("E1", "2024-03-01"): {"regularHours": -1, "overtimeHours": 0, "shifts": 0}
+    }
+
+
+def test_identical_edit_writes_nothing(db):
+    assert deltas(db, [(record("A"), record("A"))]) == {}
+
+
+def test_edit_to_another_day_moves_the_shift(db):
+    assert deltas(db, [(record("A", date="2024-03-01"), record("A", date="2024-03-02", regular=6))]) == {
+        day_key("E1", "2024-03-01"): {"regularHours": -8, "overtimeHours": 0, "shifts": -1},
+        day_key("E1", "2024-03-02"): {"regularHours": 6, "overtimeHours": 0, "shifts": 1},
+    }
+
+
+def test_reopen_removes_the_shift(db):
+    assert deltas(db, [(record("A", regular=8, overtime=2), record("A", status="OPEN"))]) == {
+        day_key("E1", "2024-03-01"): {"regularHours": -8, "overtimeHours": -2, "shifts": -1}
+    }
+
+
+def test_migration_upserts_merge_per_day(db):
+    changes = [
+        (None, record("A", regular=8)),
+        (None, record("B", regular=4, overtime=1)),
+        (record("C", regular=8), record("C", regular=5)),
+        (None, record("D", employee="E2")),
+        (None, record("E", status="OPEN", employee="E3")),
+    ]
+    assert deltas(db, changes) == {
+        day_key("E1", "2024-03-01"): {"regularHours": 9, "overtimeHours": 1, "shifts": 2},
+        day_key("E2", "2024-03-01"): {"regularHours": 8, "overtimeHours": 0, "shifts": 1},
+    }
+
+
+def test_new_day_document_records_its_key(db):
+    async def apply():
+        await DailyHours(db).apply_many([(None, record("A"))])
+        return await db.daily_hours.find_one({"_id": day_key("E1", "2024-03-01")})
+
+    assert asyncio.run(apply()) == {
+        "_id": day_key("E1", "2024-03-01"), "employeeId": "E1", "date": "2024-03-01",
+        "regularHours": 8.0, "overtimeHours": 0, "shifts": 1,
+    }
+
+
+def test_apply_many_tracks_attendance(db):
+    daily_hours = DailyHours(db)
+
+    async def scenario():
+        history = [
+            (None, record("A", status="OPEN")),
+            (record("A", status="OPEN"), record("A", regular=8, overtime=1)),
+            (None, record("B", date="2024-03-02", regular=4)),
+            (record("B", date="2024-03-02", regular=4), record("B", date="2024-03-02", status="OPEN")),
+            (record("A", regular=8, overtime=1), record("A", regular=7.25, overtime=1)),
+        ]
+        for before, after in history:
+            await db.attendance.replace_one({"id": after["id"]}, after, upsert=True)
+            await daily_hours.apply_many([(before, after)])
+        return await daily_hours.check(), await db.daily_hours.find_one({"_id": day_key("E1", "2024-03-01")})
+
+    mismatches, day = asyncio.run(scenario())
+    assert mismatches == []
+    assert (day["regularHours"], day["overtimeHours"], day["shifts"]) == (7.25, 1, 1)
+
+
+def test_check_and_rebuild(db):
+    daily_hours = DailyHours(db)
+
+    async def scenario():
+        await db.attendance.insert_many([
+            record("A", date="2024-03-01", regular=8),
+            record("B", date="2024-03-01", regular=2, overtime=1),
+            record("C", date="2024-03-05", regular=6),
+            record("D", date="2024-03-05", status="OPEN"),
+        ])
+        await db.daily_hours.insert_many([
+            {"_id": day_key("E1", "2024-03-01"), "employeeId": "E1", "date": "2024-03-01",
+             "regularHours": 8, "overtimeHours": 0, "shifts": 1},
+            {"_id": day_key("E9", "2024-03-02"), "employeeId": "E9", "date": "2024-03-02",
+             "regularHours": 3, "overtimeHours": 0, "shifts": 1},
+        ])
+        before = await daily_hours.check()
+        in_range = await daily_hours.check("2024-03-05", "2024-03-31")
+        rebuilt = await daily_hours.rebuild()
+        return before, in_range, rebuilt, await daily_hours.check(), await db.daily_hours.count_documents({})
+
+    before, in_range, rebuilt, after, stored = asyncio.run(scenario())
+    assert [item["key"] for item in before] == [
+        day_key("E1", "2024-03-01"), day_key("E1", "2024-03-05"), day_key("E9", "2024-03-02")
+    ]
+    assert before[0]["expected"] == {"regularHours": 10, "overtimeHours": 1, "shifts": 2}
+    assert [item["key"] for item in in_range] == [day_key("E1", "2024-03-05")]
+    assert rebuilt == 2
+    assert after == []
+    # The stale E9 day is deleted, not left behind
+    assert stored == 2
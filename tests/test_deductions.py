@@ -0,0 +1,115 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import deductions
+from deductions import ContributionTable, DeductionRegistry, tables_version
+
+TABLES_DIR = Path(deductions.__file__).parent / "deduction_tables"
+
+
+def make_table(kind="sss", effective_date="2023-01-01", **extra):
+    spec = {
+        "deduction": kind,
+        "effectiveDate": effective_date,
+        "brackets": [
+            {"upTo": 1000, "employee": 10.0, "employer": 20.0},
+            {"upTo": 2000, "employee": 15.0, "employer": 30.0},
+            {"upTo": None, "employeeRate": 0.01, "employerRate": 0.02},
+        ],
+    }
+    spec.update(extra)
+    return ContributionTable(spec)
+
+
+@pytest.fixture(scope="module")
+def registry():
+    return DeductionRegistry.load(TABLES_DIR)
+
+
+def test_bracket_upper_bound_is_inclusive():
+    table = make_table()
+    assert table.lookup(1000) == (10.0, 20.0)
+    assert table.lookup(1000.01) == (15.0, 30.0)
+    assert table.lookup(2000) == (15.0, 30.0)
+    assert table.lookup(0) == (10.0, 20.0)
+
+
+def test_open_bracket_applies_rate_to_clamped_salary():
+    table = make_table(salaryFloor=3000, salaryCeiling=5000)
+    assert table.lookup(1500) == (15.0, 30.0)
+    assert table.lookup(2500) == (30.0, 60.0)
+    assert table.lookup(4000) == (40.0, 80.0)
+    assert table.lookup(9000) == (50.0, 100.0)
+
+
+def test_last_bracket_must_be_open():
+    with pytest.raises(ValueError):
+        ContributionTable({
+            "deduction": "sss",
+            "effectiveDate": "2023-01-01",
+            "brackets": [{"upTo": 1000, "employee": 10.0}],
+        })
+
+
+def test_lookup_many_matches_lookup(registry):
+    salaries = np.array([0, 3999.99, 4000, 4250, 4250.01, 10400, 29250, 29250.01, 30000, 1e6,
+                         9999.99, 10000, 10000.01, 1500, 1500.01, 100000, 100000.01])
+    for kind in registry.kinds:
+        table = registry.table_for(kind, "2024-06-01")
+        employee, employer = table.lookup_many(salaries)
+        expected = [table.lookup(float(s)) for s in salaries]
+        assert list(zip(employee.tolist(), employer.tolist())) == expected
+
+
+def test_sss_table_edges(registry):
+    sss = registry.table_for("sss", "2024-06-01")
+    assert sss.lookup(4250) == (180.0, 390.0)
+    assert sss.lookup(4250.01) == (202.5, 437.5)
+    assert sss.lookup(29250) == (1305.0, 2765.0)
+    assert sss.lookup(29250.01) == (1350.0, 2865.0)
+
+
+def test_rate_tables_clamp_to_floor_and_ceiling(registry):
+    philhealth = registry.table_for("philhealth", "2024-06-01")
+    assert philhealth.lookup(8000) == (250.0, 250.0)
+    assert philhealth.lookup(40000) == (1000.0, 1000.0)
+    assert philhealth.lookup(200000) == (2500.0, 2500.0)
+
+    pagibig = registry.table_for("pagibig", "2024-06-01")
+    assert pagibig.lookup(1500) == (15.0, 30.0)
+    assert pagibig.lookup(1500.01) == (30.0, 30.0)
+    assert pagibig.lookup(50000) == (200.0, 200.0)
+
+
+def test_table_for_picks_table_in_force():
+    registry = DeductionRegistry([
+        make_table(effective_date="2023-01-01"),
+        make_table(effective_date="2025-01-01"),
+    ])
+    assert registry.table_for("sss", "2024-12-31").effective_date == "2023-01-01"
+    assert registry.table_for("sss", "2025-01-01").effective_date == "2025-01-01"
+    assert registry.table_for("sss", "2025-01-01T08:00:00").effective_date == "2025-01-01"
+    assert registry.table_for("sss", "2030-06-01").effective_date == "2025-01-01"
+
+
+def test_table_for_falls_back_to_oldest_table(registry):
+    assert registry.table_for("sss", "2001-01-01").effective_date == "2023-01-01"
+    assert registry.table_for("pagibig", "2024-01-31").effective_date == "2024-02-01"
+
+
+def test_table_for_unknown_kind(registry):
+    with pytest.raises(KeyError):
+        registry.table_for("gsis", "2024-06-01")
+
+
+def test_duplicate_effective_dates_rejected():
+    with pytest.raises(ValueError):
+        DeductionRegistry([make_table(), make_table()])
+
+
+def test_tables_version_is_stable(registry):
+    tables = registry.tables_for("2024-06-01")
+    assert tables_version(tables) == "pagibig@2024-02-01,philhealth@2024-01-01,sss@2023-01-01"
+    assert tables_version(dict(reversed(list(tables.items())))) == tables_version(tables)
@@ -0,0 +1,36 @@
+import asyncio
+import os
+
+import pytest
+
+pytest.importorskip("motor")
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from indexes import QUERY_SHAPES, check_plans
+
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+
+
+@pytest.fixture(scope="module")
+def mongo_url():
+    client = MongoClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip(f"no mongod reachable at {MONGO_URL}")
+    finally:
+        client.close()
+    return MONGO_URL
+
+
+def test_query_shapes_are_well_formed():
+    for shape in QUERY_SHAPES:
+        assert shape["route"] and shape["collection"]
+        assert ("filter" in shape) != ("pipeline" in shape), shape["route"]
+    routes = [shape["route"] for shape in QUERY_SHAPES]
+    assert len(routes) == len(set(routes))
+
+
+def test_no_query_shape_plans_a_collection_scan(mongo_url):
+    assert asyncio.run(check_plans(mongo_url, "index_plan_check_pytest")) == 0
@@ -0,0 +1,100 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from pagination import InvalidCursor, decode_cursor, encode_cursor, fetch_page, keyset_filter
+
+MIXED_SORT = [("date", -1), ("name", 1), ("id", 1)]
+
+
+def matches(doc: dict, condition: dict) -> bool:
+    """
+    Evaluate the subset of Mongo filters keyset_filter produces
+    """
+    if "$or" in condition:
+        return any(matches(doc, clause) for clause in condition["$or"])
+    for field, expected in condition.items():
+        if isinstance(expected, dict):
+            (op, value), = expected.items()
+            if op == "$gt" and not doc[field] > value:
+                return False
+            if op == "$lt" and not doc[field] < value:
+                return False
+        elif doc[field] != expected:
+            return False
+    return True
+
+
+def sort_docs(docs, sort):
+    ordered = list(docs)
+    # Stable sorts applied from the last key to the first give a compound sort
+    for field, direction in reversed(sort):
+        ordered.sort(key=lambda doc: doc[field], reverse=direction < 0)
+    return ordered
+
+
+def make_docs():
+    base = datetime(2024, 3, 1, 8, 0)
+    return [
+        {"id": f"id-{i:02d}", "date": base + timedelta(days=i % 3), "name": "abc"[i % 4 % 3]}
+        for i in range(20)
+    ]
+
+
+def test_cursor_round_trips_datetimes():
+    doc = {"date": datetime(2024, 3, 1, 8, 30, 15, 123000), "name": "b", "id": "x"}
+    assert decode_cursor(encode_cursor(doc, MIXED_SORT), MIXED_SORT) == [doc["date"], "b", "x"]
+
+
+def test_cursor_is_urlsafe_without_padding():
+    cursor = encode_cursor({"date": "2024-03-01", "name": "???>>>", "id": "~~"}, MIXED_SORT)
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "bm90IGpzb24", "eyJhIjoxfQ", "WzFd"])
+def test_decode_rejects_bad_cursors(cursor):
+    # Garbage, non-JSON, a JSON object, and a list of the wrong length
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, MIXED_SORT)
+
+
+def test_keyset_filter_clauses():
+    assert keyset_filter([("date", -1), ("id", 1)], ["2024-03-01", "b"]) == {"$or": [
+        {"date": {"$lt": "2024-03-01"}},
+        {"date": "2024-03-01", "id": {"$gt": "b"}},
+    ]}
+
+
+@pytest.mark.parametrize("sort", [
+    MIXED_SORT,
+    [("date", 1), ("name", -1), ("id", -1)],
+    [("name", -1), ("id", 1)],
+])
+def test_keyset_filter_selects_rows_after_cursor(sort):
+    ordered = sort_docs(make_docs(), sort)
+    for i, last in enumerate(ordered):
+        condition = keyset_filter(sort, [last[field] for field, _ in sort])
+        assert [doc for doc in ordered if matches(doc, condition)] == ordered[i + 1:]
+
+
+@pytest.mark.parametrize("limit", [1, 3, 7, 20, 50])
+def test_fetch_page_pages_to_completion(limit):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+
+    async def page_through():
+        collection = mongomock_motor.AsyncMongoMockClient()["test"]["docs"]
+        docs = make_docs()
+        await collection.insert_many([dict(doc) for doc in docs])
+        seen, cursor, pages = [], None, 0
+        while True:
+            page, cursor = await fetch_page(collection, {}, MIXED_SORT, limit, cursor, {"_id": 0})
+            seen.extend(page)
+            pages += 1
+            assert len(page) <= limit
+            if cursor is None:
+                return docs, seen, pages
+
+    docs, seen, pages = asyncio.run(page_through())
+    assert [doc["id"] for doc in seen] == [doc["id"] for doc in sort_docs(docs, MIXED_SORT)]
+    assert pages == max(-(-len(docs) // limit), 1)
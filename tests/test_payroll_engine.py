@@ -0,0 +1,70 @@
+from pathlib import Path
+
+import pytest
+
+import deductions
+from deductions import DeductionRegistry
+from payroll_engine import compute_payroll
+
+TABLES_DIR = Path(deductions.__file__).parent / "deduction_tables"
+
+# SSS shares the pre-registry calculate_sss_contribution returned, as
+# (hourly rate, employee share, employer share); monthly salary is rate * 208
+BASELINE_SSS = [
+    (10.0, 180.0, 390.0),       # 2080, below the first bracket
+    (20.4326923, 180.0, 390.0),  # 4250, exactly on the first bound
+    (25.0, 225.0, 485.0),      # 5200
+    (50.0, 472.5, 1007.5),     # 10400
+    (100.0, 945.0, 2005.0),    # 20800
+    (140.625, 1305.0, 2765.0),  # 29250, exactly on the last closed bound
+    (200.0, 1350.0, 2865.0),   # 41600, above the ceiling
+]
+
+
+@pytest.fixture(scope="module")
+def sss_only():
+    registry = DeductionRegistry.load(TABLES_DIR)
+    return {"sss": registry.table_for("sss", "2024-06-01")}
+
+
+def test_sss_matches_baseline(sss_only):
+    rates = [rate for rate, _, _ in BASELINE_SSS]
+    result = compute_payroll(rates, [80] * len(rates), [0] * len(rates), sss_only)
+    assert result["sss_employee"].tolist() == [employee for _, employee, _ in BASELINE_SSS]
+    assert result["sss_employer"].tolist() == [employer for _, _, employer in BASELINE_SSS]
+
+
+def test_pay_and_net_pay(sss_only):
+    result = compute_payroll([50.0], [80], [10], sss_only)
+    assert result["overtime_rate"].tolist() == [62.5]
+    assert result["regular_pay"].tolist() == [4000.0]
+    assert result["overtime_pay"].tolist() == [625.0]
+    assert result["gross_pay"].tolist() == [4625.0]
+    assert result["total_hours"].tolist() == [90.0]
+    assert result["total_deductions"].tolist() == [472.5]
+    assert result["net_pay"].tolist() == [4152.5]
+
+
+def test_disabled_deduction_is_zero(sss_only):
+    result = compute_payroll([50.0, 50.0], [80, 80], [0, 0], sss_only, {"sss": [True, False]})
+    assert result["sss_employee"].tolist() == [472.5, 0.0]
+    assert result["sss_employer"].tolist() == [1007.5, 0.0]
+    assert result["net_pay"].tolist() == [3527.5, 4000.0]
+
+
+def test_all_tables_add_up():
+    registry = DeductionRegistry.load(TABLES_DIR)
+    result = compute_payroll([50.0], [80], [0], registry.tables_for("2024-06-01"))
+    # 10400 monthly: SSS 472.50, PhilHealth 2.5% = 260, Pag-IBIG 2% of the 10,000 ceiling = 200
+    assert result["philhealth_employee"].tolist() == [260.0]
+    assert result["pagibig_employee"].tolist() == [200.0]
+    assert result["total_deductions"].tolist() == [472.5 + 260.0 + 200.0]
+
+
+def test_net_pay_never_negative():
+    registry = DeductionRegistry.load(TABLES_DIR)
+    # One 8-hour day: 400 gross against 932.50 of monthly contributions
+    result = compute_payroll([50.0], [8], [0], registry.tables_for("2024-06-01"))
+    assert result["gross_pay"].tolist() == [400.0]
+    assert result["total_deductions"].tolist() == [932.5]
+    assert result["net_pay"].tolist() == [0.0]